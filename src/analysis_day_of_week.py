@@ -7,6 +7,8 @@ Focuses on weekend-to-Monday transitions (gaming binges might show up here).
 
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Figures are only saved to disk, never shown
 import matplotlib.pyplot as plt
 from pathlib import Path
 
@@ -14,12 +16,23 @@ from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.utils import DATA_ANALYSIS, OUTPUT_FIGURES, OUTPUT_TABLES, setup_logging, ensure_dirs
+from src.utils import (
+    DATA_ANALYSIS, OUTPUT_FIGURES, OUTPUT_TABLES, TAGGED_DTYPES,
+    read_csv_cached, setup_logging, ensure_dirs
+)
 
 logger = setup_logging(__name__)
 
 DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
 
+# Weekend: Fri-Sun, Monday after weekend, rest of weekdays (Tue-Thu)
+WEEK_BUCKETS = {
+    0: 'monday',
+    1: 'midweek_tue_thu', 2: 'midweek_tue_thu', 3: 'midweek_tue_thu',
+    4: 'weekend_fri_sun', 5: 'weekend_fri_sun', 6: 'weekend_fri_sun',
+}
+WEEK_BUCKET_COLUMNS = ['weekend_fri_sun', 'monday', 'midweek_tue_thu']
+
 
 def load_tagged_data():
     """Load the tagged analysis dataset."""
@@ -28,29 +41,30 @@ def load_tagged_data():
         logger.error(f"Tagged data not found at {path}")
         return None
 
-    df = pd.read_csv(path)
-    df['date'] = pd.to_datetime(df['date'])
+    df = read_csv_cached(
+        path, columns=['treatment', 'period', 'day_of_week', 'count'],
+        parse_dates=['date'], dtype=TAGGED_DTYPES
+    )
     logger.info(f"Loaded {len(df):,} tagged records")
     return df
 
 
 def analyze_day_of_week(df: pd.DataFrame) -> pd.DataFrame:
     """Analyze day-of-week patterns by treatment and period."""
-    # Ensure day_of_week is numeric
-    df['day_of_week'] = pd.to_numeric(df['day_of_week'], errors='coerce')
-    df = df.dropna(subset=['day_of_week'])
-    df['day_of_week'] = df['day_of_week'].astype(int)
-
+    # day_of_week is loaded as int8 (TAGGED_DTYPES), so no coercion is needed
     # Aggregate by treatment, period, and day of week
-    dow_stats = df.groupby(['treatment', 'period', 'day_of_week']).agg({
-        'count': ['sum', 'mean', 'std']
-    }).reset_index()
+    # Named aggregation on the single column avoids the MultiIndex-column
+    # frame (and its rename) that a dict-of-lists agg builds
+    dow_stats = df.groupby(
+        ['treatment', 'period', 'day_of_week'], observed=True
+    )['count'].agg(total='sum', mean='mean', std='std').reset_index()
 
-    dow_stats.columns = ['treatment', 'period', 'day_of_week', 'total', 'mean', 'std']
-    dow_stats['day_name'] = dow_stats['day_of_week'].apply(lambda x: DAY_NAMES[int(x)])
+    dow_stats['day_name'] = pd.Categorical.from_codes(dow_stats['day_of_week'], categories=DAY_NAMES)
 
     # Calculate percentage of weekly total
-    weekly_totals = dow_stats.groupby(['treatment', 'period'])['total'].transform('sum')
+    weekly_totals = dow_stats.groupby(
+        ['treatment', 'period'], observed=True
+    )['total'].transform('sum')
     dow_stats['pct_of_week'] = dow_stats['total'] / weekly_totals * 100
 
     return dow_stats
@@ -93,37 +107,31 @@ def plot_day_of_week_comparison(dow_stats: pd.DataFrame, output_path: Path):
 
 def analyze_weekend_effect(dow_stats: pd.DataFrame) -> pd.DataFrame:
     """Analyze weekend vs weekday patterns."""
-    results = []
-
-    for treatment in dow_stats['treatment'].unique():
-        for period in ['pre', 'post']:
-            data = dow_stats[(dow_stats['treatment'] == treatment) &
-                            (dow_stats['period'] == period)]
-
-            # Weekend: Fri-Sun (4, 5, 6)
-            weekend = data[data['day_of_week'].isin([4, 5, 6])]['total'].sum()
-
-            # Monday after weekend
-            monday = data[data['day_of_week'] == 0]['total'].sum()
+    buckets = dow_stats['day_of_week'].map(WEEK_BUCKETS).rename('bucket')
 
-            # Rest of weekdays (Tue-Thu)
-            midweek = data[data['day_of_week'].isin([1, 2, 3])]['total'].sum()
+    # Keep the treatment x (pre, post) row layout even for empty groups
+    groups = pd.MultiIndex.from_product(
+        [dow_stats['treatment'].unique(), ['pre', 'post']],
+        names=['treatment', 'period']
+    )
 
-            total = data['total'].sum()
+    results = (
+        dow_stats.groupby(['treatment', 'period', buckets], observed=True)['total'].sum()
+        .unstack('bucket', fill_value=0)
+        .reindex(index=groups, columns=WEEK_BUCKET_COLUMNS, fill_value=0)
+    )
+    results['total'] = (
+        dow_stats.groupby(['treatment', 'period'], observed=True)['total'].sum()
+        .reindex(groups, fill_value=0)
+    )
 
-            results.append({
-                'treatment': treatment,
-                'period': period,
-                'weekend_fri_sun': weekend,
-                'monday': monday,
-                'midweek_tue_thu': midweek,
-                'total': total,
-                'weekend_pct': weekend / total * 100 if total > 0 else 0,
-                'monday_pct': monday / total * 100 if total > 0 else 0,
-                'midweek_pct': midweek / total * 100 if total > 0 else 0,
-            })
+    has_total = results['total'] > 0
+    for col, pct_col in [('weekend_fri_sun', 'weekend_pct'),
+                         ('monday', 'monday_pct'),
+                         ('midweek_tue_thu', 'midweek_pct')]:
+        results[pct_col] = (results[col] / results['total'] * 100).where(has_total, 0)
 
-    return pd.DataFrame(results)
+    return results.reset_index()
 
 
 def main():
@@ -152,10 +160,9 @@ def main():
     print("\n=== Day-of-Week Analysis Summary ===")
     print("\nGTA Release - Weekend vs Weekday Patterns:")
 
-    gta_pre = weekend_effect[(weekend_effect['treatment'] == 'gta') &
-                              (weekend_effect['period'] == 'pre')].iloc[0]
-    gta_post = weekend_effect[(weekend_effect['treatment'] == 'gta') &
-                               (weekend_effect['period'] == 'post')].iloc[0]
+    by_group = weekend_effect.set_index(['treatment', 'period'])
+    gta_pre = by_group.loc[('gta', 'pre')]
+    gta_post = by_group.loc[('gta', 'post')]
 
     print(f"\nPre-release:")
     print(f"  Weekend (Fri-Sun): {gta_pre['weekend_pct']:.1f}%")
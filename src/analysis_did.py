@@ -13,7 +13,10 @@ The key coefficient of interest is β3 (the interaction term).
 import pandas as pd
 import numpy as np
 import statsmodels.api as sm
+from scipy import stats
 import statsmodels.formula.api as smf
+import matplotlib
+matplotlib.use('Agg')  # Figures are only saved to disk, never shown
 import matplotlib.pyplot as plt
 from pathlib import Path
 
@@ -21,7 +24,10 @@ from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.utils import DATA_ANALYSIS, OUTPUT_FIGURES, OUTPUT_TABLES, setup_logging, ensure_dirs
+from src.utils import (
+    DATA_ANALYSIS, OUTPUT_FIGURES, OUTPUT_TABLES, TAGGED_DTYPES,
+    read_csv_cached, setup_logging, ensure_dirs
+)
 
 logger = setup_logging(__name__)
 
@@ -33,20 +39,53 @@ def load_analysis_data():
         logger.error(f"Analysis data not found at {path}")
         return None
 
-    df = pd.read_csv(path)
-    df['date'] = pd.to_datetime(df['date'])
+    df = read_csv_cached(
+        path, columns=['date', 'city', 'treatment', 'period', 'count'],
+        parse_dates=['date'], dtype=TAGGED_DTYPES
+    )
     logger.info(f"Loaded {len(df):,} tagged violation records")
 
     return df
 
 
-def run_did_regression(df: pd.DataFrame, treatment_col: str = 'gta',
+def significance_stars(p: float) -> str:
+    """Return conventional significance stars for a p-value."""
+    if p < 0.01:
+        return '***'
+    elif p < 0.05:
+        return '**'
+    elif p < 0.1:
+        return '*'
+    return ''
+
+
+def aggregate_daily_panel(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate tagged violations to one row per date, city, treatment and period.
+
+    Summing across violation types (and overlapping release windows) once
+    here lets every DiD comparison reuse the same compact panel.
+
+    Args:
+        df: Tagged violations dataframe
+
+    Returns:
+        DataFrame with date, city, treatment, period and summed count
+    """
+    daily = df.groupby(['date', 'city', 'treatment', 'period'], observed=True).agg({
+        'count': 'sum'
+    }).reset_index()
+
+    return daily
+
+
+def run_did_regression(daily: pd.DataFrame, treatment_col: str = 'gta',
                        control_col: str = 'reference') -> dict:
     """
     Run difference-in-differences regression.
 
     Args:
-        df: Tagged violations dataframe
+        daily: Daily panel from aggregate_daily_panel
         treatment_col: Value in 'treatment' column for treatment group
         control_col: Value in 'treatment' column for control group
 
@@ -54,55 +93,75 @@ def run_did_regression(df: pd.DataFrame, treatment_col: str = 'gta',
         Dictionary with regression results
     """
     # Filter to treatment and control groups only
-    subset = df[df['treatment'].isin([treatment_col, control_col])].copy()
+    daily_agg = daily[daily['treatment'].isin([treatment_col, control_col])].copy()
 
-    if len(subset) < 10:
+    if len(daily_agg) < 10:
         logger.warning(f"Not enough data for {treatment_col} vs {control_col}")
         return None
 
     # Create dummy variables
-    subset['is_treated'] = (subset['treatment'] == treatment_col).astype(int)
-    subset['is_post'] = (subset['period'] == 'post').astype(int)
-    subset['treated_x_post'] = subset['is_treated'] * subset['is_post']
-
-    # Aggregate to daily level per group for cleaner regression
-    # (avoids double-counting due to violation types)
-    daily_agg = subset.groupby(['date', 'city', 'is_treated', 'is_post', 'treated_x_post']).agg({
-        'count': 'sum'
-    }).reset_index()
-
-    # Ensure count is numeric
-    daily_agg['count'] = pd.to_numeric(daily_agg['count'], errors='coerce')
-    daily_agg = daily_agg.dropna(subset=['count'])
+    daily_agg['is_treated'] = (daily_agg['treatment'] == treatment_col).astype(int)
+    daily_agg['is_post'] = (daily_agg['period'] == 'post').astype(int)
+    daily_agg['treated_x_post'] = daily_agg['is_treated'] * daily_agg['is_post']
 
-    # Add city dummies for fixed effects
-    daily_agg = pd.get_dummies(daily_agg, columns=['city'], drop_first=True)
-
-    # Run OLS regression
+    # Absorb city fixed effects with the within transformation: demeaning
+    # the outcome and regressors by city gives the same coefficients as
+    # city dummies while keeping the design matrix at 3 regressors
     # violations = β0 + β1(post) + β2(treated) + β3(treated_x_post) + city_FE
-    y = daily_agg['count'].astype(float)
     X_cols = ['is_post', 'is_treated', 'treated_x_post']
-
-    # Add city fixed effects if available
-    city_cols = [c for c in daily_agg.columns if c.startswith('city_')]
-    X_cols.extend(city_cols)
-
-    X = daily_agg[X_cols].astype(float)
-    X = sm.add_constant(X)
-
-    model = sm.OLS(y, X).fit(cov_type='HC1')  # Robust standard errors
+    fe_cols = ['count'] + X_cols
+    demeaned = (
+        daily_agg[fe_cols].astype(float)
+        - daily_agg.groupby('city', observed=True)[fe_cols].transform('mean')
+    )
+
+    y = demeaned['count']
+    X = demeaned[X_cols]
+
+    # Demeaned data has no intercept, so the regression has no constant
+    model = sm.OLS(y, X).fit(cov_type='HC0')
+
+    # HC1 robust standard errors: scale HC0 by n / (n - k), where k also
+    # counts the intercept and city dummies absorbed by the demeaning, so
+    # they match the dummy-variable regression
+    n_params = len(X_cols) + daily_agg['city'].nunique()
+    df_resid = len(daily_agg) - n_params
+    std_error = model.bse * np.sqrt(len(daily_agg) / df_resid)
+    z_value = model.params / std_error
+    z_crit = stats.norm.ppf(0.975)
+    coefficients = pd.DataFrame({
+        'coefficient': model.params,
+        'std_error': std_error,
+        'z_value': z_value,
+        'p_value': 2 * stats.norm.sf(np.abs(z_value)),
+        'ci_lower': model.params - z_crit * std_error,
+        'ci_upper': model.params + z_crit * std_error,
+    })
+
+    # Report R² of the full model (including city effects), not the
+    # within R² of the demeaned regression
+    counts = daily_agg['count'].astype(float)
+    r_squared = 1 - model.ssr / ((counts - counts.mean()) ** 2).sum()
 
     logger.info(f"\nDiD Regression: {treatment_col} vs {control_col}")
     logger.info(f"N = {len(daily_agg)}")
-    logger.info(f"R² = {model.rsquared:.4f}")
+    logger.info(f"R² = {r_squared:.4f}")
+
+    # Interaction term (the DiD estimate), extracted once for reporting
+    did = coefficients.loc['treated_x_post']
 
     return {
         'treatment': treatment_col,
         'control': control_col,
         'n_obs': len(daily_agg),
-        'r_squared': model.rsquared,
-        'model': model,
-        'summary': model.summary()
+        'df_resid': df_resid,
+        'r_squared': r_squared,
+        'coefficients': coefficients,
+        'did_coef': did['coefficient'],
+        'did_se': did['std_error'],
+        'did_pvalue': did['p_value'],
+        'did_ci': (did['ci_lower'], did['ci_upper']),
+        'did_stars': significance_stars(did['p_value']),
     }
 
 
@@ -110,18 +169,21 @@ def run_all_analyses(df: pd.DataFrame) -> list:
     """Run all DiD analyses and return results."""
     results = []
 
+    # Aggregate once; each comparison only filters this panel
+    daily = aggregate_daily_panel(df)
+
     # Main analysis: GTA vs Reference years
-    result = run_did_regression(df, 'gta', 'reference')
+    result = run_did_regression(daily, 'gta', 'reference')
     if result:
         results.append(result)
 
     # Placebo test: Comparison games vs Reference years
-    result = run_did_regression(df, 'comparison', 'reference')
+    result = run_did_regression(daily, 'comparison', 'reference')
     if result:
         results.append(result)
 
     # Direct comparison: GTA vs Comparison games
-    result = run_did_regression(df, 'gta', 'comparison')
+    result = run_did_regression(daily, 'gta', 'comparison')
     if result:
         results.append(result)
 
@@ -133,24 +195,18 @@ def save_results_table(results: list, output_path: Path):
     rows = []
 
     for r in results:
-        model = r['model']
-        params = model.params
-        pvalues = model.pvalues
-        ci = model.conf_int()
-
-        for var in ['is_post', 'is_treated', 'treated_x_post']:
-            if var in params.index:
-                rows.append({
-                    'comparison': f"{r['treatment']} vs {r['control']}",
-                    'variable': var,
-                    'coefficient': params[var],
-                    'std_error': model.bse[var],
-                    'p_value': pvalues[var],
-                    'ci_lower': ci.loc[var, 0],
-                    'ci_upper': ci.loc[var, 1],
-                    'n_obs': r['n_obs'],
-                    'r_squared': r['r_squared']
-                })
+        for var, coef in r['coefficients'].iterrows():
+            rows.append({
+                'comparison': f"{r['treatment']} vs {r['control']}",
+                'variable': var,
+                'coefficient': coef['coefficient'],
+                'std_error': coef['std_error'],
+                'p_value': coef['p_value'],
+                'ci_lower': coef['ci_lower'],
+                'ci_upper': coef['ci_upper'],
+                'n_obs': r['n_obs'],
+                'r_squared': r['r_squared']
+            })
 
     results_df = pd.DataFrame(rows)
     results_df.to_csv(output_path, index=False)
@@ -170,22 +226,19 @@ def plot_did_coefficients(results: list, output_path: Path):
     colors = []
 
     for i, r in enumerate(results):
-        model = r['model']
-        if 'treated_x_post' in model.params.index:
-            coef = model.params['treated_x_post']
-            se = model.bse['treated_x_post']
-            ci = model.conf_int().loc['treated_x_post']
-
-            y_pos.append(i)
-            labels.append(f"{r['treatment']} vs {r['control']}")
-            coeffs.append(coef)
-            errors.append([coef - ci[0], ci[1] - coef])
-
-            # Color based on treatment type
-            if 'gta' in r['treatment'].lower():
-                colors.append('red' if 'reference' in r['control'] else 'orange')
-            else:
-                colors.append('blue')
+        coef = r['did_coef']
+        ci_lower, ci_upper = r['did_ci']
+
+        y_pos.append(i)
+        labels.append(f"{r['treatment']} vs {r['control']}")
+        coeffs.append(coef)
+        errors.append([coef - ci_lower, ci_upper - coef])
+
+        # Color based on treatment type
+        if 'gta' in r['treatment'].lower():
+            colors.append('red' if 'reference' in r['control'] else 'orange')
+        else:
+            colors.append('blue')
 
     errors = np.array(errors).T
 
@@ -198,21 +251,8 @@ def plot_did_coefficients(results: list, output_path: Path):
 
     # Add significance indicators
     for i, r in enumerate(results):
-        model = r['model']
-        if 'treated_x_post' in model.params.index:
-            p = model.pvalues['treated_x_post']
-            if p < 0.01:
-                sig = '***'
-            elif p < 0.05:
-                sig = '**'
-            elif p < 0.1:
-                sig = '*'
-            else:
-                sig = ''
-
-            coef = model.params['treated_x_post']
-            ax.annotate(sig, xy=(coef, i), xytext=(5, 0),
-                       textcoords='offset points', fontsize=12, fontweight='bold')
+        ax.annotate(r['did_stars'], xy=(r['did_coef'], i), xytext=(5, 0),
+                   textcoords='offset points', fontsize=12, fontweight='bold')
 
     plt.tight_layout()
     plt.savefig(output_path, dpi=150, bbox_inches='tight')
@@ -221,6 +261,46 @@ def plot_did_coefficients(results: list, output_path: Path):
     logger.info(f"Saved coefficient plot to {output_path}")
 
 
+def format_regression_summary(r: dict) -> str:
+    """
+    Format one DiD regression as a plain-text summary.
+
+    Built from the stored result fields, so it reports the same
+    coefficients, standard errors and R² as did_results.csv.
+
+    Args:
+        r: Result dict from run_did_regression
+
+    Returns:
+        Summary text
+    """
+    table = r['coefficients'].rename(columns={
+        'coefficient': 'coef', 'std_error': 'std err', 'z_value': 'z', 'p_value': 'P>|z|',
+        'ci_lower': '[0.025', 'ci_upper': '0.975]',
+    })
+    table[''] = [significance_stars(p) for p in table['P>|z|']]
+
+    lines = [
+        f"DiD Regression: {r['treatment']} vs {r['control']}",
+        "=" * 78,
+        "Dep. Variable:          count (daily violations)",
+        "Fixed Effects:          city (absorbed by demeaning)",
+        f"No. Observations:       {r['n_obs']}",
+        f"Df Residuals:           {r['df_resid']}",
+        f"R-squared:              {r['r_squared']:.4f}",
+        "Covariance Type:        HC1",
+        "=" * 78,
+        table.to_string(float_format=lambda x: f"{x:.4f}"),
+        "=" * 78,
+        "",
+        "Notes:",
+        "[1] Standard Errors are heteroscedasticity robust (HC1)",
+        "[2] R-squared includes the city fixed effects",
+        "[3] * p<0.1, ** p<0.05, *** p<0.01",
+    ]
+    return "\n".join(lines) + "\n"
+
+
 def print_summary(results: list):
     """Print a summary of all analyses."""
     print("\n" + "=" * 60)
@@ -233,35 +313,21 @@ def print_summary(results: list):
         print(f"N = {r['n_obs']}, R² = {r['r_squared']:.4f}")
         print(f"{'-' * 40}")
 
-        model = r['model']
-
         # Key result: interaction term
-        if 'treated_x_post' in model.params.index:
-            coef = model.params['treated_x_post']
-            se = model.bse['treated_x_post']
-            p = model.pvalues['treated_x_post']
-
-            # Significance level
-            if p < 0.01:
-                sig = '***'
-            elif p < 0.05:
-                sig = '**'
-            elif p < 0.1:
-                sig = '*'
-            else:
-                sig = ''
-
-            print(f"DiD Coefficient (treated × post): {coef:.2f} {sig}")
-            print(f"  Standard Error: {se:.2f}")
-            print(f"  p-value: {p:.4f}")
-
-            # Interpretation
-            if p < 0.05:
-                direction = "increase" if coef > 0 else "decrease"
-                print(f"\n  SIGNIFICANT: {r['treatment']} releases associated with")
-                print(f"  {abs(coef):.0f} daily violations {direction} compared to {r['control']}")
-            else:
-                print(f"\n  NOT SIGNIFICANT at p < 0.05")
+        coef = r['did_coef']
+        p = r['did_pvalue']
+
+        print(f"DiD Coefficient (treated × post): {coef:.2f} {r['did_stars']}")
+        print(f"  Standard Error: {r['did_se']:.2f}")
+        print(f"  p-value: {p:.4f}")
+
+        # Interpretation
+        if p < 0.05:
+            direction = "increase" if coef > 0 else "decrease"
+            print(f"\n  SIGNIFICANT: {r['treatment']} releases associated with")
+            print(f"  {abs(coef):.0f} daily violations {direction} compared to {r['control']}")
+        else:
+            print(f"\n  NOT SIGNIFICANT at p < 0.05")
 
 
 def main():
@@ -289,11 +355,11 @@ def main():
     # Print summary
     print_summary(results)
 
-    # Also save full regression summaries
+    # Also save a text summary of each regression
     for r in results:
         summary_path = OUTPUT_TABLES / f"did_summary_{r['treatment']}_vs_{r['control']}.txt"
         with open(summary_path, 'w') as f:
-            f.write(str(r['summary']))
+            f.write(format_regression_summary(r))
         logger.info(f"Saved summary to {summary_path}")
 
     print("\n" + "=" * 60)
@@ -5,9 +5,15 @@ Creates event study visualization centering violations on release date (day 0).
 Shows daily violations from day -30 to day +90 relative to release.
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Figures are only saved to disk, never shown
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from pathlib import Path
 
 # Add parent to path for imports
@@ -15,8 +21,8 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.utils import (
-    DATA_PROCESSED, OUTPUT_FIGURES, GAME_RELEASES,
-    setup_logging, ensure_dirs
+    DATA_PROCESSED, OUTPUT_FIGURES, GAME_RELEASES, DAILY_DTYPES,
+    read_csv_cached, setup_logging, ensure_dirs, write_csv
 )
 
 logger = setup_logging(__name__)
@@ -29,19 +35,49 @@ def load_daily_violations():
         logger.error(f"Daily violations not found at {path}")
         return None
 
-    df = pd.read_csv(path)
-    df['date'] = pd.to_datetime(df['date'])
+    df = read_csv_cached(
+        path, columns=['date', 'count'], parse_dates=['date'], dtype=DAILY_DTYPES
+    )
     logger.info(f"Loaded {len(df):,} daily violation records")
     return df
 
 
+def date_window_bounds(daily: pd.DataFrame, start_date: pd.Timestamp,
+                       end_date: pd.Timestamp) -> tuple[int, int]:
+    """
+    Return positional [lo, hi) row bounds for dates in [start_date, end_date].
+
+    Uses binary search, so daily must be sorted by date.
+    """
+    lo = daily['date'].searchsorted(start_date, side='left')
+    hi = daily['date'].searchsorted(end_date, side='right')
+    return int(lo), int(hi)
+
+
+def centered_rolling_mean(values, window: int = 7) -> np.ndarray:
+    """
+    Centered moving average over a fixed window, NaN where the window is incomplete.
+
+    Equivalent to Series.rolling(window, center=True).mean() on gap-free data,
+    computed with a single convolution.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    smoothed = np.full(len(values), np.nan)
+    if len(values) >= window:
+        start = window // 2
+        smoothed[start:start + len(values) - window + 1] = np.convolve(
+            values, np.ones(window) / window, mode='valid'
+        )
+    return smoothed
+
+
 def create_event_study_data(daily: pd.DataFrame, game: str, release_date: pd.Timestamp,
                             days_before: int = 30, days_after: int = 90) -> pd.DataFrame:
     """
     Create event study data centered on release date.
 
     Args:
-        daily: Daily violation data
+        daily: Daily violation data, sorted by date
         game: Game name for labeling
         release_date: Release date to center on
         days_before: Days before release to include
@@ -53,21 +89,26 @@ def create_event_study_data(daily: pd.DataFrame, game: str, release_date: pd.Tim
     start_date = release_date - pd.Timedelta(days=days_before)
     end_date = release_date + pd.Timedelta(days=days_after)
 
-    # Filter to event window
-    event_data = daily[(daily['date'] >= start_date) & (daily['date'] <= end_date)].copy()
+    # Filter to event window (a contiguous slice, since daily is date-sorted)
+    lo, hi = date_window_bounds(daily, start_date, end_date)
+    event_data = daily.iloc[lo:hi]
 
     if event_data.empty:
         logger.warning(f"No data for {game} event window")
         return pd.DataFrame()
 
-    # Calculate days from release
-    event_data['days_from_release'] = (event_data['date'] - release_date).dt.days
+    # Calculate days from release as integers straight from the datetime64 values
+    days_from_release = (
+        (event_data['date'].to_numpy() - release_date.to_datetime64()) // np.timedelta64(1, 'D')
+    )
 
-    # Aggregate by day (across cities and violation types)
-    event_agg = event_data.groupby('days_from_release').agg({
-        'count': 'sum',
-        'date': 'first'
-    }).reset_index()
+    # Aggregate by day (across cities and violation types); sorted by day
+    event_agg = (
+        event_data['count'].groupby(days_from_release, sort=True).sum()
+        .rename_axis('days_from_release')
+        .reset_index()
+    )
+    event_agg['date'] = release_date + pd.to_timedelta(event_agg['days_from_release'], unit='D')
 
     event_agg['game'] = game
     event_agg['release_date'] = release_date
@@ -76,30 +117,35 @@ def create_event_study_data(daily: pd.DataFrame, game: str, release_date: pd.Tim
 
 
 def plot_event_study(event_data: pd.DataFrame, game: str,
-                     lag_days: int, output_path: Path):
+                     lag_days: int, output_path: Path, ax=None):
     """
     Plot event study for a single game.
 
     Args:
-        event_data: Event study data
+        event_data: Event study data, sorted by days_from_release
         game: Game name
         lag_days: Days of lag before analysis window starts
         output_path: Where to save plot
+        ax: Axes to clear and reuse; a new figure is created if None
     """
-    fig, ax = plt.subplots(figsize=(14, 6))
+    # Standalone Figures (not registered with pyplot) so games can be
+    # plotted concurrently from worker threads
+    if ax is None:
+        ax = Figure(figsize=(14, 6)).subplots()
+    else:
+        ax.cla()
+    fig = ax.figure
 
-    x = event_data['days_from_release']
-    y = event_data['count']
+    x = event_data['days_from_release'].to_numpy()
+    y = event_data['count'].to_numpy()
 
     # Plot line
     ax.plot(x, y, 'b-', linewidth=1.5, alpha=0.8)
     ax.fill_between(x, 0, y, alpha=0.3)
 
     # Add 7-day rolling average
-    event_data_sorted = event_data.sort_values('days_from_release')
-    rolling_avg = event_data_sorted['count'].rolling(window=7, center=True).mean()
-    ax.plot(event_data_sorted['days_from_release'], rolling_avg, 'r-',
-            linewidth=2, label='7-day moving average')
+    rolling_avg = centered_rolling_mean(y)
+    ax.plot(x, rolling_avg, 'r-', linewidth=2, label='7-day moving average')
 
     # Mark key dates
     ax.axvline(x=0, color='green', linestyle='--', linewidth=2, label='Release Date (Day 0)')
@@ -123,9 +169,8 @@ def plot_event_study(event_data: pd.DataFrame, game: str,
     # Format y-axis
     ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: format(int(x), ',')))
 
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    plt.close()
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=150, bbox_inches='tight')
 
     logger.info(f"Saved event study plot for {game} to {output_path}")
 
@@ -146,7 +191,7 @@ def plot_combined_event_study(all_events: pd.DataFrame, output_path: Path):
             game_data['normalized'] = game_data['count'] / pre_mean * 100
 
             # 7-day rolling average
-            rolling = game_data['normalized'].rolling(window=7, center=True).mean()
+            rolling = centered_rolling_mean(game_data['normalized'])
 
             color = colors.get(game, 'gray')
             ax.plot(game_data['days_from_release'], rolling,
@@ -169,6 +214,85 @@ def plot_combined_event_study(all_events: pd.DataFrame, output_path: Path):
     logger.info(f"Saved combined event study to {output_path}")
 
 
+def combine_event_data(all_events: list) -> pd.DataFrame:
+    """
+    Stack per-game event study frames into one frame.
+
+    Each frame has the same columns, and game/release_date are constant
+    within a frame, so the varying columns are concatenated once and the
+    per-game values are repeated rather than copying every frame.
+    """
+    lengths = [len(e) for e in all_events]
+
+    def stacked(col):
+        return np.concatenate([e[col].to_numpy() for e in all_events])
+
+    return pd.DataFrame({
+        'days_from_release': stacked('days_from_release'),
+        'count': stacked('count'),
+        'date': stacked('date'),
+        'game': np.repeat([e['game'].iloc[0] for e in all_events], lengths),
+        'release_date': np.repeat(
+            [e['release_date'].iloc[0].to_datetime64() for e in all_events], lengths
+        ),
+    })
+
+
+def process_game(game: str, info: dict, daily: pd.DataFrame,
+                 lag_days: int = 60, ax=None) -> pd.DataFrame:
+    """
+    Build and plot the event study for a single game.
+
+    Args:
+        game: Game name
+        info: Release info from GAME_RELEASES
+        daily: Daily violation data, sorted by date
+        lag_days: Days of lag before analysis window starts
+        ax: Axes to reuse for the plot (see plot_event_study)
+
+    Returns:
+        Event study data, or None if there is no data around the release
+    """
+    release_str = info.get('pc') or info.get('console')
+    if not release_str:
+        return None
+
+    release_date = pd.to_datetime(release_str)
+
+    # Check if we have data around this date
+    check_start = release_date - pd.Timedelta(days=30)
+    check_end = release_date + pd.Timedelta(days=30)
+    lo, hi = date_window_bounds(daily, check_start, check_end)
+    has_data = hi > lo
+
+    if not has_data:
+        logger.warning(f"No data around {game} release ({release_date})")
+        return None
+
+    # Create event study data
+    event_data = create_event_study_data(daily, game, release_date)
+
+    if event_data.empty:
+        return None
+
+    # Plot individual event study
+    plot_path = OUTPUT_FIGURES / f"event_study_{game.lower().replace(' ', '_')}.png"
+    plot_event_study(event_data, game, lag_days, plot_path, ax=ax)
+
+    return event_data
+
+
+def process_games(games: list, daily: pd.DataFrame) -> list:
+    """
+    Run process_game for a batch of (game, info) pairs on one reused figure.
+
+    Returns:
+        List of event study data (or None) in the order of games
+    """
+    ax = Figure(figsize=(14, 6)).subplots()
+    return [process_game(game, info, daily, ax=ax) for game, info in games]
+
+
 def main():
     """Main entry point for event study analysis."""
     ensure_dirs()
@@ -178,45 +302,30 @@ def main():
     if daily is None:
         return False
 
-    all_events = []
-
-    # Create event study for each game
-    for game, info in GAME_RELEASES.items():
-        release_str = info.get('pc') or info.get('console')
-        if not release_str:
-            continue
-
-        release_date = pd.to_datetime(release_str)
-
-        # Check if we have data around this date
-        check_start = release_date - pd.Timedelta(days=30)
-        check_end = release_date + pd.Timedelta(days=30)
-        has_data = ((daily['date'] >= check_start) & (daily['date'] <= check_end)).any()
-
-        if not has_data:
-            logger.warning(f"No data around {game} release ({release_date})")
-            continue
-
-        # Create event study data
-        event_data = create_event_study_data(daily, game, release_date)
+    # Sort once so every event window is found by binary search
+    daily = daily.sort_values('date', kind='stable').reset_index(drop=True)
 
-        if event_data.empty:
-            continue
+    # Create event study for each game; games are independent, so split
+    # them round-robin into one batch per worker thread, and each batch
+    # reuses a single figure (lag of 60 days from chunk 4 analysis)
+    games = list(GAME_RELEASES.items())
+    n_workers = min(len(games), os.cpu_count() or 1)
+    batches = [games[i::n_workers] for i in range(n_workers)]
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        batch_results = list(executor.map(lambda batch: process_games(batch, daily), batches))
 
-        all_events.append(event_data)
+    # Undo the round-robin split to keep GAME_RELEASES order
+    results = [batch_results[i % n_workers][i // n_workers] for i in range(len(games))]
 
-        # Plot individual event study
-        lag_days = 60  # From chunk 4 analysis
-        plot_path = OUTPUT_FIGURES / f"event_study_{game.lower().replace(' ', '_')}.png"
-        plot_event_study(event_data, game, lag_days, plot_path)
+    all_events = [event_data for event_data in results if event_data is not None]
 
     if not all_events:
         logger.error("No event study data generated!")
         return False
 
     # Combine all events
-    combined = pd.concat(all_events, ignore_index=True)
-    combined.to_csv(DATA_PROCESSED / "event_study_data.csv", index=False)
+    combined = combine_event_data(all_events)
+    write_csv(combined, DATA_PROCESSED / "event_study_data.csv")
 
     # Plot combined event study
     plot_combined_event_study(combined, OUTPUT_FIGURES / "event_study_combined.png")
@@ -8,6 +8,8 @@ violations when people are playing/influenced by the game).
 
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Figures are only saved to disk, never shown
 import matplotlib.pyplot as plt
 from pathlib import Path
 
@@ -17,11 +19,25 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.utils import (
     DATA_PROCESSED, DATA_ANALYSIS, OUTPUT_FIGURES, OUTPUT_TABLES,
-    GAME_RELEASES, setup_logging, ensure_dirs
+    GAME_RELEASES, HOURLY_DTYPES, read_csv_cached, setup_logging, ensure_dirs
 )
 
 logger = setup_logging(__name__)
 
+# Peak-hour bands as hour -> band membership, one column per band. Hour 22
+# is in both the evening (7-10pm) and late-night (10pm-2am) bands, so a
+# single band id per hour can't express them.
+HOUR_BANDS = {
+    'morning_7_9': [7, 8, 9],
+    'afternoon_12_14': [12, 13, 14],
+    'evening_19_22': [19, 20, 21, 22],
+    'late_night_22_2': [22, 23, 0, 1, 2],
+}
+HOUR_BAND_MEMBERSHIP = np.array(
+    [[hour in hours for hours in HOUR_BANDS.values()] for hour in range(24)],
+    dtype=np.int64
+)
+
 
 def load_hourly_data():
     """Load hourly violation data if available."""
@@ -30,21 +46,59 @@ def load_hourly_data():
         logger.warning(f"Hourly data not found at {path}")
         return None
 
-    df = pd.read_csv(path)
-    df['date'] = pd.to_datetime(df['date'])
+    df = read_csv_cached(path, parse_dates=['date'], dtype=HOURLY_DTYPES)
     logger.info(f"Loaded {len(df):,} hourly violation records")
 
     return df
 
 
-def tag_hourly_data(hourly: pd.DataFrame) -> pd.DataFrame:
-    """Tag hourly data with release periods (similar to daily tagging)."""
+def build_hourly_matrix(hourly: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pivot hourly records into a dense day x hour count matrix.
+
+    Every city and violation type is summed into its (day, hour) cell, so
+    period totals become contiguous row-mask reductions instead of groupbys.
+
+    Args:
+        hourly: Hourly violation records with date, hour and count columns
+
+    Returns:
+        Tuple of (dates, counts): the sorted unique days as datetime64[D]
+        and an int64 array of shape (len(dates), 24)
+    """
+    # Skip records without a valid hour of the day; packed into the cell
+    # index, they would land in another day's row (or past the last one)
+    valid_hour = hourly['hour'].between(0, 23)
+    if not valid_hour.all():
+        logger.warning(f"Dropping {(~valid_hour).sum():,} hourly records with an hour outside 0-23")
+        hourly = hourly[valid_hour]
+
+    days = hourly['date'].to_numpy().astype('datetime64[D]')
+    dates, day_idx = np.unique(days, return_inverse=True)
+
+    cells = day_idx * 24 + hourly['hour'].to_numpy(dtype=np.int64)
+    counts = np.bincount(cells, weights=hourly['count'].to_numpy(), minlength=len(dates) * 24)
+
+    return dates, counts.reshape(len(dates), 24).astype(np.int64)
+
+
+def tag_hourly_data(dates: np.ndarray) -> np.ndarray:
+    """
+    Tag days with release periods (similar to daily tagging).
+
+    Args:
+        dates: Days of the hourly matrix, as returned by build_hourly_matrix()
+
+    Returns:
+        Array of 'pre', 'post' or '' (outside both windows) per day, or None
+        if the GTA V release date is unknown
+    """
     # Get GTA V release date
     gta_info = GAME_RELEASES.get('GTA V', {})
     release_str = gta_info.get('pc') or gta_info.get('console')
     if not release_str:
         logger.error("GTA V release date not found")
-        return pd.DataFrame()
+        return None
 
     release_date = pd.to_datetime(release_str)
     lag_days = 60  # Use 60 days lag as determined in chunk 4
@@ -55,36 +109,35 @@ def tag_hourly_data(hourly: pd.DataFrame) -> pd.DataFrame:
     post_start = release_date + pd.Timedelta(days=lag_days)
     post_end = post_start + pd.Timedelta(days=28)
 
-    # Tag data
-    pre_mask = (hourly['date'] >= pre_start) & (hourly['date'] <= pre_end)
-    post_mask = (hourly['date'] >= post_start) & (hourly['date'] <= post_end)
+    # Tag days in one pass; the windows don't overlap
+    pre_mask = (dates >= pre_start.to_datetime64()) & (dates <= pre_end.to_datetime64())
+    post_mask = (dates >= post_start.to_datetime64()) & (dates <= post_end.to_datetime64())
+    period = np.select([pre_mask, post_mask], ['pre', 'post'], default='')
 
-    pre_data = hourly[pre_mask].copy()
-    pre_data['period'] = 'pre'
+    logger.info(f"Tagged {pre_mask.sum() + post_mask.sum()} days "
+                f"(pre: {pre_mask.sum()}, post: {post_mask.sum()})")
 
-    post_data = hourly[post_mask].copy()
-    post_data['period'] = 'post'
+    return period
 
-    tagged = pd.concat([pre_data, post_data], ignore_index=True)
-    logger.info(f"Tagged {len(tagged):,} hourly records (pre: {len(pre_data)}, post: {len(post_data)})")
 
-    return tagged
+def analyze_hourly_distribution(counts: np.ndarray, period: np.ndarray) -> pd.DataFrame:
+    """Analyze hourly distribution of violations by period."""
+    periods = ['pre', 'post']
 
+    # Sum the day rows of each period into one 24-hour profile
+    totals = np.stack([counts[period == p].sum(axis=0) for p in periods])
 
-def analyze_hourly_distribution(tagged: pd.DataFrame) -> pd.DataFrame:
-    """Analyze hourly distribution of violations by period."""
-    # Ensure hour is numeric
-    tagged['hour'] = pd.to_numeric(tagged['hour'], errors='coerce')
-    tagged = tagged.dropna(subset=['hour'])
-    tagged['hour'] = tagged['hour'].astype(int)
+    hourly_dist = pd.DataFrame({
+        'period': pd.Categorical(np.repeat(periods, 24), categories=periods),
+        'hour': np.tile(np.arange(24), len(periods)),
+        'count': totals.ravel(),
+    })
 
-    # Aggregate by period and hour
-    hourly_dist = tagged.groupby(['period', 'hour']).agg({
-        'count': 'sum'
-    }).reset_index()
+    # Only keep hours that had violations
+    hourly_dist = hourly_dist[hourly_dist['count'] > 0].reset_index(drop=True)
 
     # Calculate percentage of daily total for each period
-    period_totals = hourly_dist.groupby('period')['count'].transform('sum')
+    period_totals = hourly_dist.groupby('period', observed=True)['count'].transform('sum')
     hourly_dist['pct_of_total'] = hourly_dist['count'] / period_totals * 100
 
     return hourly_dist
@@ -139,39 +192,36 @@ def plot_hourly_distribution(hourly_dist: pd.DataFrame, output_path: Path):
 
 def analyze_peak_hours(hourly_dist: pd.DataFrame) -> pd.DataFrame:
     """Analyze changes in peak hours between periods."""
-    results = []
-
-    for period in ['pre', 'post']:
-        data = hourly_dist[hourly_dist['period'] == period]
-
-        # Morning peak (7-9am)
-        morning = data[data['hour'].between(7, 9)]['count'].sum()
-
-        # Afternoon peak (12-2pm)
-        afternoon = data[data['hour'].between(12, 14)]['count'].sum()
-
-        # Evening peak (7-10pm)
-        evening = data[data['hour'].between(19, 22)]['count'].sum()
-
-        # Late night (10pm-2am)
-        late_night = data[(data['hour'] >= 22) | (data['hour'] <= 2)]['count'].sum()
-
-        total = data['count'].sum()
-
-        results.append({
-            'period': period,
-            'morning_7_9': morning,
-            'afternoon_12_14': afternoon,
-            'evening_19_22': evening,
-            'late_night_22_2': late_night,
-            'total': total,
-            'morning_pct': morning / total * 100 if total > 0 else 0,
-            'afternoon_pct': afternoon / total * 100 if total > 0 else 0,
-            'evening_pct': evening / total * 100 if total > 0 else 0,
-            'late_night_pct': late_night / total * 100 if total > 0 else 0,
-        })
-
-    return pd.DataFrame(results)
+    periods = ['pre', 'post']
+
+    # One bincount builds each period's 24-hour profile, and a single matrix
+    # product sums every band (including the overlapping hour 22) from it
+    # Only rows with a known period and a valid hour have a cell
+    period_codes = pd.Categorical(hourly_dist['period'], categories=periods).codes
+    valid = (period_codes >= 0) & hourly_dist['hour'].between(0, 23).to_numpy()
+    if not valid.all():
+        logger.warning(f"Dropping {(~valid).sum():,} rows with an unknown period or hour outside 0-23")
+
+    hours = hourly_dist['hour'].to_numpy()[valid].astype(np.int64)
+    cells = period_codes[valid].astype(np.int64) * 24 + hours
+    profiles = np.bincount(
+        cells, weights=hourly_dist['count'].to_numpy()[valid], minlength=len(periods) * 24
+    ).reshape(len(periods), 24).astype(np.int64)
+
+    results = pd.DataFrame(
+        profiles @ HOUR_BAND_MEMBERSHIP,
+        index=pd.Index(periods, name='period'), columns=list(HOUR_BANDS)
+    )
+    results['total'] = profiles.sum(axis=1)
+
+    has_total = results['total'] > 0
+    for col, pct_col in [('morning_7_9', 'morning_pct'),
+                         ('afternoon_12_14', 'afternoon_pct'),
+                         ('evening_19_22', 'evening_pct'),
+                         ('late_night_22_2', 'late_night_pct')]:
+        results[pct_col] = (results[col] / results['total'] * 100).where(has_total, 0)
+
+    return results.reset_index()
 
 
 def main():
@@ -185,15 +235,16 @@ def main():
         print("CHUNK 8 SKIPPED: No hourly data available")
         return True  # Not a failure, just conditional skip
 
-    # Tag with release periods
-    tagged = tag_hourly_data(hourly)
+    # Pivot to a day x hour matrix and tag days with release periods
+    dates, counts = build_hourly_matrix(hourly)
+    period = tag_hourly_data(dates)
 
-    if tagged.empty:
+    if period is None or not (period != '').any():
         logger.error("No tagged hourly data!")
         return False
 
     # Analyze distribution
-    hourly_dist = analyze_hourly_distribution(tagged)
+    hourly_dist = analyze_hourly_distribution(counts, period)
 
     # Plot distribution
     plot_hourly_distribution(hourly_dist, OUTPUT_FIGURES / "hourly_distribution.png")
@@ -5,8 +5,11 @@ Scrapes monthly player counts for GTA V and comparison games.
 """
 
 import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
 import requests
-from bs4 import BeautifulSoup
+import requests_cache
 import pandas as pd
 from pathlib import Path
 
@@ -14,26 +17,34 @@ from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.utils import DATA_RAW, GAME_RELEASES, setup_logging, ensure_dirs
+from src.utils import DATA_RAW, GAME_RELEASES, setup_logging, ensure_dirs, write_csv
 
 logger = setup_logging(__name__)
 
 # Steam Charts URL pattern
 STEAM_CHARTS_URL = "https://steamcharts.com/app/{app_id}"
 
+# Steam Charts monthly rows change at most once a month, so responses are
+# cached on disk for a day to make re-runs free
+STEAM_CHARTS_CACHE = DATA_RAW / "steam_charts_cache.sqlite"
+STEAM_CHARTS_CACHE_SECONDS = 24 * 60 * 60
+
 # Request headers to avoid being blocked
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 }
 
 
-def scrape_steam_charts(app_id: int, game_name: str) -> pd.DataFrame:
+def scrape_steam_charts(app_id: int, game_name: str,
+                        session: requests.Session = None) -> pd.DataFrame:
     """
     Scrape monthly player data from Steam Charts for a given game.
 
     Args:
         app_id: Steam application ID
         game_name: Name of the game for the output
+        session: HTTP session to fetch with, e.g. a requests_cache.CachedSession
+            (plain requests if None)
 
     Returns:
         DataFrame with columns: game, date, avg_players, peak_players
@@ -42,86 +53,84 @@ def scrape_steam_charts(app_id: int, game_name: str) -> pd.DataFrame:
     logger.info(f"Scraping {game_name} from {url}")
 
     try:
-        response = requests.get(url, headers=HEADERS, timeout=30)
+        response = (session or requests).get(url, headers=HEADERS, timeout=30)
         response.raise_for_status()
     except requests.RequestException as e:
         logger.error(f"Failed to fetch data for {game_name}: {e}")
         return pd.DataFrame()
 
-    soup = BeautifulSoup(response.text, "html.parser")
+    # Be nice to the server (cached responses never touched it)
+    if not getattr(response, "from_cache", False):
+        time.sleep(1.5)
 
     # Find the data table - Steam Charts uses a table with class "common-table"
-    table = soup.find("table", class_="common-table")
-    if not table:
+    try:
+        table = pd.read_html(StringIO(response.text), attrs={"class": "common-table"},
+                             flavor="lxml", thousands=",")[0]
+    except ValueError:
         logger.warning(f"No data table found for {game_name}")
         return pd.DataFrame()
 
-    rows = []
-    # Get all rows from the table (may or may not have tbody)
-    all_rows = table.find_all("tr")
-
-    for tr in all_rows:
-        cells = tr.find_all("td")
-        if len(cells) >= 5:
-            # Columns: Month, Avg Players, Gain, % Gain, Peak Players
-            month_str = cells[0].get_text(strip=True)
-            avg_str = cells[1].get_text(strip=True)
-            peak_str = cells[4].get_text(strip=True)
-
-            # Skip "Last 30 Days" row - we want monthly data
-            if "Last 30 Days" in month_str:
-                continue
-
-            # Parse numbers (remove commas, handle floats)
-            try:
-                # Parse as float first, then convert to int
-                avg_players = int(float(avg_str.replace(",", "").replace("-", "0")))
-                peak_players = int(float(peak_str.replace(",", "").replace("-", "0")))
-
-                # Parse month (format: "November 2025")
-                try:
-                    date = pd.to_datetime(month_str, format="%B %Y")
-                except ValueError:
-                    # Try alternate format
-                    try:
-                        date = pd.to_datetime(month_str)
-                    except ValueError:
-                        logger.warning(f"Could not parse date: {month_str}")
-                        continue
-
-                rows.append({
-                    "game": game_name,
-                    "date": date,
-                    "avg_players": avg_players,
-                    "peak_players": peak_players,
-                })
-            except (ValueError, AttributeError) as e:
-                logger.debug(f"Could not parse row: {e}")
-                continue
-
-    df = pd.DataFrame(rows)
+    # Columns: Month, Avg Players, Gain, % Gain, Peak Players
+    if table.shape[1] < 5:
+        logger.warning(f"Unexpected table layout for {game_name}")
+        return pd.DataFrame()
+    month = table.iloc[:, 0].astype(str).str.strip()
+
+    # Skip "Last 30 Days" row - we want monthly data
+    monthly = ~month.str.contains("Last 30 Days", regex=False)
+    table, month = table[monthly], month[monthly]
+
+    # Parse month (format: "November 2025"), dropping rows that don't parse
+    date = pd.to_datetime(month, format="%B %Y", errors="coerce")
+    if date.isna().any():
+        logger.warning(f"Could not parse dates: {month[date.isna()].tolist()}")
+
+    # Parse numbers; missing values ("-") count as zero
+    def parse_players(col):
+        return pd.to_numeric(col, errors="coerce").fillna(0).astype(int)
+
+    df = pd.DataFrame({
+        "game": game_name,
+        "date": date,
+        "avg_players": parse_players(table.iloc[:, 1]),
+        "peak_players": parse_players(table.iloc[:, 4]),
+    })[date.notna()].reset_index(drop=True)
+
     logger.info(f"Collected {len(df)} months of data for {game_name}")
     return df
 
 
-def collect_all_player_data() -> pd.DataFrame:
+def collect_all_player_data(max_workers: int = 4) -> pd.DataFrame:
     """
     Collect player data for all games defined in GAME_RELEASES.
 
+    Games are scraped concurrently through one cached session; each worker
+    still pauses between live requests, so the server sees at most
+    max_workers requests in flight.
+
+    Args:
+        max_workers: Maximum number of concurrent page requests
+
     Returns:
         Combined DataFrame with all games' player data.
     """
-    all_data = []
+    session = requests_cache.CachedSession(
+        str(STEAM_CHARTS_CACHE), backend="sqlite",
+        expire_after=STEAM_CHARTS_CACHE_SECONDS
+    )
+
+    games = [(game_name, info["steam_app_id"])
+             for game_name, info in GAME_RELEASES.items() if info.get("steam_app_id")]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            lambda game: scrape_steam_charts(game[1], game[0], session=session), games
+        ))
 
-    for game_name, info in GAME_RELEASES.items():
-        app_id = info.get("steam_app_id")
-        if app_id:
-            df = scrape_steam_charts(app_id, game_name)
-            if not df.empty:
-                all_data.append(df)
-            # Be nice to the server
-            time.sleep(1.5)
+    session.close()
 
+    all_data = [df for df in results if not df.empty]
     if all_data:
         combined = pd.concat(all_data, ignore_index=True)
         combined = combined.sort_values(["game", "date"]).reset_index(drop=True)
@@ -142,7 +151,7 @@ def main():
         return False
 
     output_path = DATA_RAW / "player_counts.csv"
-    df.to_csv(output_path, index=False)
+    write_csv(df, output_path)
     logger.info(f"Saved {len(df)} rows to {output_path}")
 
     # Print summary
@@ -13,10 +13,18 @@ from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.utils import DATA_PROCESSED, DATA_ANALYSIS, setup_logging, ensure_dirs
+from src.utils import (
+    DATA_PROCESSED, DATA_ANALYSIS, DAILY_DTYPES, read_csv_cached, setup_logging, ensure_dirs,
+    write_csv
+)
 
 logger = setup_logging(__name__)
 
+# Fixed category orders for the tag columns, so grouping works on small
+# integer codes instead of hashing strings
+TREATMENT_DTYPE = pd.CategoricalDtype(['gta', 'comparison', 'reference'])
+PERIOD_DTYPE = pd.CategoricalDtype(['pre', 'post'])
+
 
 def load_data():
     """Load processed violation and release window data."""
@@ -26,8 +34,7 @@ def load_data():
         logger.error(f"Daily violations not found at {daily_path}")
         return None, None
 
-    daily = pd.read_csv(daily_path)
-    daily['date'] = pd.to_datetime(daily['date'])
+    daily = read_csv_cached(daily_path, parse_dates=['date'], dtype=DAILY_DTYPES)
     logger.info(f"Loaded {len(daily):,} daily violation records")
 
     # Load release windows
@@ -36,34 +43,40 @@ def load_data():
         logger.error(f"Release windows not found at {release_path}")
         return None, None
 
-    releases = pd.read_csv(release_path)
-    for col in ['release_date', 'peak_date', 'stabilization_date']:
-        releases[col] = pd.to_datetime(releases[col])
+    releases = read_csv_cached(
+        release_path, parse_dates=['release_date', 'peak_date', 'stabilization_date']
+    )
     logger.info(f"Loaded {len(releases)} game releases")
 
     return daily, releases
 
 
-def tag_violations(daily: pd.DataFrame, releases: pd.DataFrame) -> pd.DataFrame:
+def build_tag_windows(releases: pd.DataFrame) -> pd.DataFrame:
     """
-    Tag each violation record with treatment information.
+    Build the date windows each violation record can be tagged with.
 
     For each release, we define:
     - Pre-period: [release_date - 42 days, release_date - 14 days]
     - Post-period: [stabilization_date, stabilization_date + 28 days]
       OR using recommended lag: [release_date + lag, release_date + lag + 28 days]
+    plus the same two windows shifted one year back and one year forward.
 
     Treatment types:
     - 'gta': GTA V release
     - 'comparison': Other game releases (placebo)
     - 'reference': Same calendar dates in a different year (control)
+
+    Returns:
+        DataFrame with one row per window: release_id, treatment, period,
+        start, end (inclusive) and the release_date it is measured from;
+        release_id, treatment and period are categorical
     """
-    all_tagged = []
+    windows = []
 
-    for _, release in releases.iterrows():
-        game = release['game']
-        release_date = release['release_date']
-        lag_days = release['recommended_lag_days']
+    for release in releases.itertuples(index=False):
+        game = release.game
+        release_date = release.release_date
+        lag_days = release.recommended_lag_days
 
         # Define analysis windows
         # Pre-period: 42 to 14 days before release
@@ -78,78 +91,83 @@ def tag_violations(daily: pd.DataFrame, releases: pd.DataFrame) -> pd.DataFrame:
                     f"Post [{post_start.date()} to {post_end.date()}]")
 
         # Determine treatment type
-        if 'gta' in game.lower():
-            treatment = 'gta'
-        else:
-            treatment = 'comparison'
-
-        # Tag violations in pre-period
-        pre_mask = (daily['date'] >= pre_start) & (daily['date'] <= pre_end)
-        pre_violations = daily[pre_mask].copy()
-        pre_violations['period'] = 'pre'
-        pre_violations['treatment'] = treatment
-        pre_violations['release_id'] = game
-        pre_violations['release_date'] = release_date
-        pre_violations['days_from_release'] = (pre_violations['date'] - release_date).dt.days
-
-        # Tag violations in post-period
-        post_mask = (daily['date'] >= post_start) & (daily['date'] <= post_end)
-        post_violations = daily[post_mask].copy()
-        post_violations['period'] = 'post'
-        post_violations['treatment'] = treatment
-        post_violations['release_id'] = game
-        post_violations['release_date'] = release_date
-        post_violations['days_from_release'] = (post_violations['date'] - release_date).dt.days
-
-        all_tagged.append(pre_violations)
-        all_tagged.append(post_violations)
+        treatment = 'gta' if 'gta' in game.lower() else 'comparison'
+
+        windows.append((game, treatment, 'pre', pre_start, pre_end, release_date))
+        windows.append((game, treatment, 'post', post_start, post_end, release_date))
 
         # Create reference year windows (same dates, different year)
         # Use 1 year before or after the release
         for year_offset in [-1, 1]:
-            try:
-                ref_pre_start = pre_start + pd.DateOffset(years=year_offset)
-                ref_pre_end = pre_end + pd.DateOffset(years=year_offset)
-                ref_post_start = post_start + pd.DateOffset(years=year_offset)
-                ref_post_end = post_end + pd.DateOffset(years=year_offset)
-
-                # Reference pre-period
-                ref_pre_mask = (daily['date'] >= ref_pre_start) & (daily['date'] <= ref_pre_end)
-                ref_pre = daily[ref_pre_mask].copy()
-                if not ref_pre.empty:
-                    ref_pre['period'] = 'pre'
-                    ref_pre['treatment'] = 'reference'
-                    ref_pre['release_id'] = f"{game}_ref_{year_offset:+d}yr"
-                    ref_pre['release_date'] = release_date + pd.DateOffset(years=year_offset)
-                    ref_pre['days_from_release'] = (
-                        ref_pre['date'] - ref_pre['release_date']
-                    ).dt.days
-                    all_tagged.append(ref_pre)
-
-                # Reference post-period
-                ref_post_mask = (daily['date'] >= ref_post_start) & (daily['date'] <= ref_post_end)
-                ref_post = daily[ref_post_mask].copy()
-                if not ref_post.empty:
-                    ref_post['period'] = 'post'
-                    ref_post['treatment'] = 'reference'
-                    ref_post['release_id'] = f"{game}_ref_{year_offset:+d}yr"
-                    ref_post['release_date'] = release_date + pd.DateOffset(years=year_offset)
-                    ref_post['days_from_release'] = (
-                        ref_post['date'] - ref_post['release_date']
-                    ).dt.days
-                    all_tagged.append(ref_post)
-
-            except Exception as e:
-                logger.warning(f"Could not create reference year {year_offset} for {game}: {e}")
-
-    if not all_tagged:
+            shift = pd.DateOffset(years=year_offset)
+            release_id = f"{game}_ref_{year_offset:+d}yr"
+            windows.append((release_id, 'reference', 'pre',
+                            pre_start + shift, pre_end + shift, release_date + shift))
+            windows.append((release_id, 'reference', 'post',
+                            post_start + shift, post_end + shift, release_date + shift))
+
+    windows = pd.DataFrame(windows, columns=[
+        'release_id', 'treatment', 'period', 'start', 'end', 'release_date'
+    ])
+    return windows.astype({
+        'release_id': 'category',
+        'treatment': TREATMENT_DTYPE,
+        'period': PERIOD_DTYPE,
+    })
+
+
+def tag_violations(daily: pd.DataFrame, releases: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tag each violation record with treatment information.
+
+    Every window from build_tag_windows() is joined against the daily data
+    in one vectorized pass; a record falling in several windows (e.g. a
+    reference year overlapping another release) appears once per window.
+    Rows are ordered by window, then by their position in daily.
+    """
+    windows = build_tag_windows(releases)
+
+    # Work on whole days since the epoch as plain int64 arrays
+    day_numbers = daily['date'].to_numpy().astype('datetime64[D]').view('int64')
+    starts, ends, release_days = (
+        windows[col].to_numpy().astype('datetime64[D]').view('int64')
+        for col in ['start', 'end', 'release_date']
+    )
+
+    # Sort the days once so each window is a contiguous slice found by
+    # binary search rather than a full boolean mask
+    order = np.argsort(day_numbers, kind='stable')
+    sorted_days = day_numbers[order]
+    lo = np.searchsorted(sorted_days, starts, side='left')
+    hi = np.searchsorted(sorted_days, ends, side='right')
+
+    # Expand the (lo, hi) slices into one (daily row, window) pair per match
+    sizes = hi - lo
+    window_ids = np.repeat(np.arange(len(windows)), sizes)
+    slice_pos = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    rows = order[np.repeat(lo, sizes) + slice_pos]
+
+    # Keep each window's rows in their original order
+    keep = np.lexsort((rows, window_ids))
+    rows, window_ids = rows[keep], window_ids[keep]
+
+    if len(rows) == 0:
         logger.error("No violations tagged!")
         return pd.DataFrame()
 
-    tagged = pd.concat(all_tagged, ignore_index=True)
-
-    # Convert release_date back to string for CSV storage
-    tagged['release_date'] = tagged['release_date'].dt.strftime('%Y-%m-%d')
+    # Build the output in one go: every column is gathered straight into its
+    # final array, with no intermediate frame or column-by-column inserts
+    tagged = pd.DataFrame({
+        **{col: daily[col].array.take(rows) for col in daily.columns},
+        # Categorical takes only gather the integer codes
+        'period': windows['period'].array.take(window_ids),
+        'treatment': windows['treatment'].array.take(window_ids),
+        'release_id': windows['release_id'].array.take(window_ids),
+        # Kept as a datetime; write_csv emits midnight timestamps as plain
+        # dates, so no per-row string formatting is needed
+        'release_date': windows['release_date'].to_numpy()[window_ids],
+        'days_from_release': (day_numbers[rows] - release_days[window_ids]).astype(np.int32),
+    })
 
     logger.info(f"Tagged {len(tagged):,} violation records")
     return tagged
@@ -173,19 +191,25 @@ def main():
 
     # Save tagged dataset
     output_path = DATA_ANALYSIS / "tagged_violations.csv"
-    tagged.to_csv(output_path, index=False)
+    write_csv(tagged, output_path)
     logger.info(f"Saved tagged violations to {output_path}")
 
     # Print summary
     print("\n=== Analysis Dataset Summary ===")
     print(f"\nTotal tagged records: {len(tagged):,}")
 
+    # The tag columns are categorical and tagged is already in window order,
+    # so group on observed codes and keep that order rather than re-sorting
     print("\nBy treatment and period:")
-    summary = tagged.groupby(['treatment', 'period'])['count'].agg(['sum', 'count'])
+    summary = tagged.groupby(
+        ['treatment', 'period'], observed=True, sort=False
+    )['count'].agg(['sum', 'count'])
     print(summary.to_string())
 
     print("\nBy release:")
-    release_summary = tagged.groupby(['release_id', 'treatment', 'period'])['count'].agg(['sum', 'count'])
+    release_summary = tagged.groupby(
+        ['release_id', 'treatment', 'period'], observed=True, sort=False
+    )['count'].agg(['sum', 'count'])
     print(release_summary.to_string())
 
     print("\nDate coverage:")
@@ -4,6 +4,9 @@ Chunk 10: Summary Statistics and Final Report.
 Generates summary tables and compiles all results.
 """
 
+import io
+import os
+
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -14,8 +17,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.utils import (
     DATA_RAW, DATA_PROCESSED, DATA_ANALYSIS,
-    OUTPUT_FIGURES, OUTPUT_TABLES,
-    setup_logging, ensure_dirs
+    OUTPUT_FIGURES, OUTPUT_TABLES, DAILY_DTYPES, HOURLY_DTYPES, PLAYER_DTYPES, TAGGED_DTYPES,
+    read_csv_cached, setup_logging, ensure_dirs, summarize_daily_violations
 )
 
 logger = setup_logging(__name__)
@@ -28,8 +31,10 @@ def generate_data_summary():
     # Player counts
     player_path = DATA_RAW / "player_counts.csv"
     if player_path.exists():
-        players = pd.read_csv(player_path)
-        players['date'] = pd.to_datetime(players['date'])
+        players = pd.read_csv(
+            player_path, usecols=['date', 'game', 'avg_players'], parse_dates=['date'],
+            dtype=PLAYER_DTYPES
+        )
         summaries.append({
             'Dataset': 'Player Counts',
             'Records': len(players),
@@ -41,8 +46,9 @@ def generate_data_summary():
     # Daily violations
     daily_path = DATA_PROCESSED / "daily_violations.csv"
     if daily_path.exists():
-        daily = pd.read_csv(daily_path)
-        daily['date'] = pd.to_datetime(daily['date'])
+        daily = read_csv_cached(
+            daily_path, columns=['date', 'city'], parse_dates=['date'], dtype=DAILY_DTYPES
+        )
         summaries.append({
             'Dataset': 'Daily Violations',
             'Records': len(daily),
@@ -54,8 +60,9 @@ def generate_data_summary():
     # Hourly violations
     hourly_path = DATA_PROCESSED / "hourly_violations.csv"
     if hourly_path.exists():
-        hourly = pd.read_csv(hourly_path)
-        hourly['date'] = pd.to_datetime(hourly['date'])
+        hourly = read_csv_cached(
+            hourly_path, columns=['date', 'city'], parse_dates=['date'], dtype=HOURLY_DTYPES
+        )
         summaries.append({
             'Dataset': 'Hourly Violations',
             'Records': len(hourly),
@@ -67,7 +74,10 @@ def generate_data_summary():
     # Tagged analysis data
     tagged_path = DATA_ANALYSIS / "tagged_violations.csv"
     if tagged_path.exists():
-        tagged = pd.read_csv(tagged_path)
+        tagged = read_csv_cached(
+            tagged_path, columns=['release_id', 'treatment'], parse_dates=['date'],
+            dtype=TAGGED_DTYPES
+        )
         summaries.append({
             'Dataset': 'Tagged Analysis',
             'Records': len(tagged),
@@ -85,18 +95,19 @@ def generate_violation_summary():
     if not daily_path.exists():
         return pd.DataFrame()
 
-    daily = pd.read_csv(daily_path)
-    daily['date'] = pd.to_datetime(daily['date'])
-    daily['year'] = daily['date'].dt.year
+    # Use the summary process_violations saved alongside the daily data,
+    # unless the daily data has been rewritten since (round-trip parsing
+    # reads the stored means and stds back bit-for-bit)
+    summary_path = DATA_PROCESSED / "daily_violations_summary.csv"
+    if summary_path.exists() and summary_path.stat().st_mtime >= daily_path.stat().st_mtime:
+        return pd.read_csv(summary_path, float_precision='round_trip')
 
     # Summary by city and type
-    summary = daily.groupby(['city', 'violation_type']).agg({
-        'count': ['sum', 'mean', 'std', 'min', 'max']
-    }).reset_index()
-
-    summary.columns = ['city', 'violation_type', 'total', 'daily_mean', 'daily_std', 'daily_min', 'daily_max']
-
-    return summary
+    daily = read_csv_cached(
+        daily_path, columns=['city', 'violation_type', 'count'], parse_dates=['date'],
+        dtype=DAILY_DTYPES
+    )
+    return summarize_daily_violations(daily)
 
 
 def generate_release_windows_summary():
@@ -108,8 +119,9 @@ def generate_release_windows_summary():
     rw = pd.read_csv(path)
     rw = rw[['game', 'release_date', 'peak_date', 'stabilization_date', 'recommended_lag_days', 'peak_players']]
 
-    # Format peak players
-    rw['peak_players'] = rw['peak_players'].apply(lambda x: f"{x:,}")
+    # Format peak players with thousands separators; mapping the bound
+    # format method skips the per-row lambda and Series.apply dispatch
+    rw['peak_players'] = rw['peak_players'].map('{:,}'.format)
 
     return rw
 
@@ -144,17 +156,19 @@ def generate_did_summary():
 
 
 def list_outputs():
-    """List all generated outputs."""
-    outputs = {'Tables': [], 'Figures': []}
-
-    for table in OUTPUT_TABLES.glob('*.csv'):
-        outputs['Tables'].append(table.name)
-
-    for table in OUTPUT_TABLES.glob('*.txt'):
-        outputs['Tables'].append(table.name)
-
-    for fig in OUTPUT_FIGURES.glob('*.png'):
-        outputs['Figures'].append(fig.name)
+    """List all generated outputs, sorted by name."""
+    outputs = {}
+
+    # List each directory once and dispatch on suffix; like glob('*.csv'),
+    # hidden files are skipped
+    for key, directory, suffixes in [('Tables', OUTPUT_TABLES, ('.csv', '.txt')),
+                                     ('Figures', OUTPUT_FIGURES, ('.png',))]:
+        with os.scandir(directory) as entries:
+            outputs[key] = sorted(
+                entry.name for entry in entries
+                if entry.name.endswith(suffixes) and not entry.name.startswith('.')
+                and entry.is_file()
+            )
 
     return outputs
 
@@ -163,47 +177,51 @@ def main():
     """Main entry point for summary generation."""
     ensure_dirs()
 
-    print("=" * 70)
-    print("GTA RISKY DRIVING STATS - FINAL REPORT")
-    print("=" * 70)
+    # Collect the whole report and write it to stdout in one go, rather than
+    # flushing each section (and table) separately
+    report = io.StringIO()
+
+    print("=" * 70, file=report)
+    print("GTA RISKY DRIVING STATS - FINAL REPORT", file=report)
+    print("=" * 70, file=report)
 
     # Data summary
-    print("\n" + "=" * 50)
-    print("1. DATA SUMMARY")
-    print("=" * 50)
+    print("\n" + "=" * 50, file=report)
+    print("1. DATA SUMMARY", file=report)
+    print("=" * 50, file=report)
     data_summary = generate_data_summary()
     data_summary.to_csv(OUTPUT_TABLES / "summary_data.csv", index=False)
-    print(data_summary.to_string(index=False))
+    print(data_summary.to_string(index=False), file=report)
 
     # Violation statistics
-    print("\n" + "=" * 50)
-    print("2. VIOLATION STATISTICS")
-    print("=" * 50)
+    print("\n" + "=" * 50, file=report)
+    print("2. VIOLATION STATISTICS", file=report)
+    print("=" * 50, file=report)
     viol_summary = generate_violation_summary()
     viol_summary.to_csv(OUTPUT_TABLES / "summary_violations.csv", index=False)
-    print(viol_summary.to_string(index=False))
+    print(viol_summary.to_string(index=False), file=report)
 
     # Release windows
-    print("\n" + "=" * 50)
-    print("3. GAME RELEASE WINDOWS")
-    print("=" * 50)
+    print("\n" + "=" * 50, file=report)
+    print("3. GAME RELEASE WINDOWS", file=report)
+    print("=" * 50, file=report)
     rw_summary = generate_release_windows_summary()
     rw_summary.to_csv(OUTPUT_TABLES / "summary_release_windows.csv", index=False)
-    print(rw_summary.to_string(index=False))
+    print(rw_summary.to_string(index=False), file=report)
 
     # DiD results
-    print("\n" + "=" * 50)
-    print("4. DIFFERENCE-IN-DIFFERENCES RESULTS")
-    print("=" * 50)
+    print("\n" + "=" * 50, file=report)
+    print("4. DIFFERENCE-IN-DIFFERENCES RESULTS", file=report)
+    print("=" * 50, file=report)
     did_summary = generate_did_summary()
     did_summary.to_csv(OUTPUT_TABLES / "summary_did.csv", index=False)
-    print(did_summary.to_string(index=False))
-    print("\n* p<0.1, ** p<0.05, *** p<0.01")
+    print(did_summary.to_string(index=False), file=report)
+    print("\n* p<0.1, ** p<0.05, *** p<0.01", file=report)
 
     # Key findings
-    print("\n" + "=" * 50)
-    print("5. KEY FINDINGS")
-    print("=" * 50)
+    print("\n" + "=" * 50, file=report)
+    print("5. KEY FINDINGS", file=report)
+    print("=" * 50, file=report)
     print("""
 1. GTA V RELEASE EFFECT:
    - The DiD analysis shows a DECREASE in violations following GTA release
@@ -231,25 +249,27 @@ INTERPRETATION:
    The data suggests that major game releases are associated with FEWER
    traffic violations, possibly because potential violators are staying
    home playing video games instead of driving.
-""")
+""", file=report)
 
     # List outputs
-    print("\n" + "=" * 50)
-    print("6. GENERATED OUTPUTS")
-    print("=" * 50)
+    print("\n" + "=" * 50, file=report)
+    print("6. GENERATED OUTPUTS", file=report)
+    print("=" * 50, file=report)
     outputs = list_outputs()
 
-    print("\nTables:")
-    for t in sorted(outputs['Tables']):
-        print(f"  - output/tables/{t}")
+    print("\nTables:", file=report)
+    for t in outputs['Tables']:
+        print(f"  - output/tables/{t}", file=report)
+
+    print("\nFigures:", file=report)
+    for f in outputs['Figures']:
+        print(f"  - output/figures/{f}", file=report)
 
-    print("\nFigures:")
-    for f in sorted(outputs['Figures']):
-        print(f"  - output/figures/{f}")
+    print("\n" + "=" * 70, file=report)
+    print("ANALYSIS COMPLETE", file=report)
+    print("=" * 70, file=report)
 
-    print("\n" + "=" * 70)
-    print("ANALYSIS COMPLETE")
-    print("=" * 70)
+    sys.stdout.write(report.getvalue())
 
     return True
 
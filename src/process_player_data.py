@@ -5,10 +5,16 @@ Loads player count data, fits decay curves, identifies when games
 stabilize after release (for analysis window definition).
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import numpy as np
 from scipy.optimize import curve_fit
+import matplotlib
+matplotlib.use('Agg')  # Figures are only saved to disk, never shown
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from pathlib import Path
 
 # Add parent to path for imports
@@ -17,7 +23,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.utils import (
     DATA_RAW, DATA_PROCESSED, OUTPUT_FIGURES,
-    GAME_RELEASES, setup_logging, ensure_dirs
+    GAME_RELEASES, setup_logging, ensure_dirs, write_csv
 )
 
 logger = setup_logging(__name__)
@@ -28,65 +34,86 @@ def exponential_decay(x, a, b, c):
     return a * np.exp(-b * x) + c
 
 
-def find_stabilization_point(df: pd.DataFrame, game: str, release_date: pd.Timestamp) -> dict:
+def first_true_per_group(mask: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
     """
-    Analyze player data for a game and find when it stabilizes post-release.
-
-    Stabilization is defined as when monthly player change drops below 15%
-    after the initial release spike (within first 6 months).
+    Find the first True position of a mask within each group.
 
     Args:
-        df: Player data for this game
-        game: Game name
-        release_date: Known release date
+        mask: Boolean array over rows
+        groups: Group code (0 to n_groups - 1) of each row
+        n_groups: Number of groups
 
     Returns:
-        dict with release_date, peak_date, stabilization_date, recommended_lag_days
+        Array of length n_groups with the first row index where mask is True
+        in each group, or -1 where it never is
     """
-    # Filter to post-release data
-    # Use the start of the release month (not exact date) since we have monthly data
-    release_month_start = release_date.replace(day=1)
-    df = df[df['date'] >= release_month_start].copy()
+    rows = np.flatnonzero(mask)
+    first = np.full(n_groups, -1, dtype=np.int64)
+    # Assign in reverse so the earliest row of each group is written last
+    first[groups[rows[::-1]]] = rows[::-1]
+    return first
 
-    if df.empty:
-        logger.warning(f"No post-release data for {game}")
-        return None
 
-    df = df.sort_values('date').reset_index(drop=True)
+def find_stabilization_points(df: pd.DataFrame, release_dates: dict) -> list:
+    """
+    Analyze player data for every game and find when each stabilizes post-release.
 
-    # Find INITIAL peak (within first 6 months after release, not overall peak)
-    # This captures the release-window behavior, not later DLC bumps
-    initial_window = df[df['date'] <= release_date + pd.Timedelta(days=180)]
+    Stabilization is defined as when monthly player change drops below 15%
+    after the initial release spike (within first 6 months). All games are
+    processed together: the frame is sorted once by game and date, and the
+    peaks, month-over-month changes and stabilization months are found with
+    array operations over every game at once.
 
-    if initial_window.empty:
-        logger.warning(f"{game}: No data in initial 6-month window")
-        return None
+    Args:
+        df: Player data with game, date and avg_players columns
+        release_dates: Known release date of each game to analyze
 
-    peak_idx = initial_window['avg_players'].idxmax()
-    peak_date = df.loc[peak_idx, 'date']
-    peak_players = df.loc[peak_idx, 'avg_players']
+    Returns:
+        List of dicts with release_date, peak_date, stabilization_date,
+        recommended_lag_days (one per game with usable data, in
+        release_dates order)
+    """
+    games = list(release_dates)
+    if not games:
+        return []
 
-    logger.info(f"{game}: Initial peak at {peak_date.strftime('%Y-%m')} with {peak_players:,} players")
+    post = df.assign(
+        game=pd.Categorical(df['game'], categories=games),
+        release_date=pd.to_datetime(df['game'].map(release_dates))
+    )
 
-    # Calculate month-over-month change for all post-release data
-    df['prev_players'] = df['avg_players'].shift(1)
-    df['pct_change'] = (df['avg_players'] - df['prev_players']) / df['prev_players'] * 100
-    df['abs_pct_change'] = df['pct_change'].abs()
+    # Filter to post-release data
+    # Use the start of the release month (not exact date) since we have monthly data
+    release = post['release_date']
+    release_month_start = release - pd.to_timedelta(release.dt.day - 1, unit='D')
+    post = post[post['date'] >= release_month_start]
+    post = post.sort_values(['game', 'date'], kind='stable').reset_index(drop=True)
 
-    # Filter to post-peak data (after initial peak)
-    post_peak = df[df['date'] > peak_date].copy()
+    group = post['game'].cat.codes.to_numpy(dtype=np.int64)
+    dates = post['date'].to_numpy()
+    players = post['avg_players'].to_numpy(dtype=np.float64)
+    release_days = post['release_date'].to_numpy()
+    has_rows = np.bincount(group, minlength=len(games)) > 0
 
-    if post_peak.empty:
-        logger.warning(f"{game}: No data after peak")
-        # Use peak date + 30 days as default
-        return {
-            'game': game,
-            'release_date': release_date.strftime('%Y-%m-%d'),
-            'peak_date': peak_date.strftime('%Y-%m-%d'),
-            'stabilization_date': (peak_date + pd.Timedelta(days=30)).strftime('%Y-%m-%d'),
-            'recommended_lag_days': 30,
-            'peak_players': int(peak_players),
-        }
+    # Find INITIAL peak (within first 6 months after release, not overall peak)
+    # This captures the release-window behavior, not later DLC bumps.
+    # Sorting the window rows by game, then players descending, puts each
+    # game's first maximum at the start of its run.
+    window_rows = np.flatnonzero(dates <= release_days + np.timedelta64(180, 'D'))
+    by_peak = window_rows[np.lexsort((window_rows, -players[window_rows], group[window_rows]))]
+    peak_idx = np.full(len(games), -1, dtype=np.int64)
+    peak_idx[group[by_peak[::-1]]] = by_peak[::-1]
+
+    # Month-over-month change within each game (the first month has none)
+    prev_players = np.roll(players, 1)
+    prev_players[np.r_[True, group[1:] != group[:-1]][:len(group)]] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        abs_pct_change = np.abs((players - prev_players) / prev_players * 100)
+
+        # Rows after their game's initial peak, and how far they have decayed
+        row_peak = peak_idx[group]
+        post_peak = (row_peak >= 0) & (dates > dates[row_peak])
+        decay_ratio = players / players[row_peak]
 
     # Find stabilization: when monthly change drops below 15% consistently
     # Also require that player count has dropped to less than 30% of peak
@@ -94,78 +121,108 @@ def find_stabilization_point(df: pd.DataFrame, game: str, release_date: pd.Times
     threshold = 15.0  # 15% month-over-month change
     decay_threshold = 0.30  # Must be below 30% of peak to be "stable"
 
-    post_peak['decay_ratio'] = post_peak['avg_players'] / peak_players
-
-    # Look for first month where:
-    # 1. Absolute change is below threshold
-    # 2. Player count has dropped significantly from peak
-    stabilized_rows = post_peak[
-        (post_peak['abs_pct_change'] < threshold) &
-        (post_peak['decay_ratio'] < decay_threshold)
-    ]
-
-    if not stabilized_rows.empty:
-        stabilization_date = stabilized_rows.iloc[0]['date']
-    else:
-        # If no point meets both criteria, look for just the decay threshold
-        decayed_rows = post_peak[post_peak['decay_ratio'] < decay_threshold]
-        if not decayed_rows.empty:
-            stabilization_date = decayed_rows.iloc[0]['date']
+    decayed = post_peak & (decay_ratio < decay_threshold)
+    first_post_peak = first_true_per_group(post_peak, group, len(games))
+    first_stable = first_true_per_group(decayed & (abs_pct_change < threshold), group, len(games))
+    first_decayed = first_true_per_group(decayed, group, len(games))
+
+    results = []
+    for code, game in enumerate(games):
+        release_date = release_dates[game]
+
+        if not has_rows[code]:
+            logger.warning(f"No post-release data for {game}")
+            continue
+
+        if peak_idx[code] < 0:
+            logger.warning(f"{game}: No data in initial 6-month window")
+            continue
+
+        peak_date = post['date'].iloc[peak_idx[code]]
+        peak_players = post['avg_players'].iloc[peak_idx[code]]
+
+        logger.info(f"{game}: Initial peak at {peak_date.strftime('%Y-%m')} with {peak_players:,} players")
+
+        if first_post_peak[code] < 0:
+            logger.warning(f"{game}: No data after peak")
+            # Use peak date + 30 days as default
+            results.append({
+                'game': game,
+                'release_date': release_date.strftime('%Y-%m-%d'),
+                'peak_date': peak_date.strftime('%Y-%m-%d'),
+                'stabilization_date': (peak_date + pd.Timedelta(days=30)).strftime('%Y-%m-%d'),
+                'recommended_lag_days': 30,
+                'peak_players': int(peak_players),
+            })
+            continue
+
+        # Look for first month where:
+        # 1. Absolute change is below threshold
+        # 2. Player count has dropped significantly from peak
+        # If no month meets both, fall back to just the decay threshold
+        if first_stable[code] >= 0:
+            stabilization_date = post['date'].iloc[first_stable[code]]
+        elif first_decayed[code] >= 0:
+            stabilization_date = post['date'].iloc[first_decayed[code]]
         else:
             # Default to 4 months post-release if still hasn't decayed
             stabilization_date = release_date + pd.Timedelta(days=120)
 
-    # Calculate recommended lag (days from release to stabilization)
-    lag_days = (stabilization_date - release_date).days
+        # Calculate recommended lag (days from release to stabilization)
+        lag_days = (stabilization_date - release_date).days
 
-    # Clamp to reasonable range (14-60 days for analysis purposes)
-    # The spec suggests using ~2-4 weeks of lag
-    recommended_lag = min(max(lag_days, 14), 60)
+        # Clamp to reasonable range (14-60 days for analysis purposes)
+        # The spec suggests using ~2-4 weeks of lag
+        recommended_lag = min(max(lag_days, 14), 60)
 
-    logger.info(f"{game}: Stabilized at {stabilization_date.strftime('%Y-%m')} "
-                f"({lag_days} days from release, using {recommended_lag} day lag)")
+        logger.info(f"{game}: Stabilized at {stabilization_date.strftime('%Y-%m')} "
+                    f"({lag_days} days from release, using {recommended_lag} day lag)")
+
+        results.append({
+            'game': game,
+            'release_date': release_date.strftime('%Y-%m-%d'),
+            'peak_date': peak_date.strftime('%Y-%m-%d'),
+            'stabilization_date': stabilization_date.strftime('%Y-%m-%d'),
+            'recommended_lag_days': recommended_lag,
+            'peak_players': int(peak_players),
+        })
 
-    return {
-        'game': game,
-        'release_date': release_date.strftime('%Y-%m-%d'),
-        'peak_date': peak_date.strftime('%Y-%m-%d'),
-        'stabilization_date': stabilization_date.strftime('%Y-%m-%d'),
-        'recommended_lag_days': recommended_lag,
-        'peak_players': int(peak_players),
-    }
+    return results
 
 
 def plot_player_curve(df: pd.DataFrame, game: str, release_date: pd.Timestamp,
                       stabilization_date: pd.Timestamp, output_path: Path):
     """Generate player engagement curve plot for a game."""
-    plt.figure(figsize=(12, 6))
+    # A standalone Figure (not registered with pyplot) so games can be
+    # plotted concurrently from worker threads
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
 
     # Plot all data
-    plt.plot(df['date'], df['avg_players'], 'b-', linewidth=2, label='Avg Players')
-    plt.fill_between(df['date'], 0, df['avg_players'], alpha=0.3)
+    ax.plot(df['date'], df['avg_players'], 'b-', linewidth=2, label='Avg Players')
+    ax.fill_between(df['date'], 0, df['avg_players'], alpha=0.3)
 
     # Mark release date
-    plt.axvline(x=release_date, color='green', linestyle='--',
-                linewidth=2, label=f'Release ({release_date.strftime("%Y-%m-%d")})')
+    ax.axvline(x=release_date, color='green', linestyle='--',
+               linewidth=2, label=f'Release ({release_date.strftime("%Y-%m-%d")})')
 
     # Mark stabilization date
-    plt.axvline(x=stabilization_date, color='red', linestyle='--',
-                linewidth=2, label=f'Stabilization ({stabilization_date.strftime("%Y-%m-%d")})')
+    ax.axvline(x=stabilization_date, color='red', linestyle='--',
+               linewidth=2, label=f'Stabilization ({stabilization_date.strftime("%Y-%m-%d")})')
 
-    plt.xlabel('Date', fontsize=12)
-    plt.ylabel('Average Players', fontsize=12)
-    plt.title(f'{game} - Player Engagement Over Time', fontsize=14)
-    plt.legend(loc='upper right')
-    plt.grid(True, alpha=0.3)
+    ax.set_xlabel('Date', fontsize=12)
+    ax.set_ylabel('Average Players', fontsize=12)
+    ax.set_title(f'{game} - Player Engagement Over Time', fontsize=14)
+    ax.legend(loc='upper right')
+    ax.grid(True, alpha=0.3)
 
     # Format y-axis with thousands separator
-    plt.gca().yaxis.set_major_formatter(
+    ax.yaxis.set_major_formatter(
         plt.FuncFormatter(lambda x, p: format(int(x), ','))
     )
 
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    plt.close()
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=150, bbox_inches='tight')
 
     logger.info(f"Saved plot to {output_path}")
 
@@ -183,41 +240,46 @@ def process_all_games() -> pd.DataFrame:
         logger.error(f"Player data not found at {player_path}")
         return pd.DataFrame()
 
-    df = pd.read_csv(player_path)
-    df['date'] = pd.to_datetime(df['date'])
+    # Parse dates while reading, and skip the unused peak_players column
+    df = pd.read_csv(player_path, usecols=['game', 'date', 'avg_players'], parse_dates=['date'])
 
     logger.info(f"Loaded {len(df):,} player data rows for {df['game'].nunique()} games")
 
-    results = []
+    # Split the data by game once, for the plots
+    game_frames = dict(tuple(df.groupby('game', sort=False)))
 
+    # Release dates (prefer PC release for Steam data) of the games we have data for
+    release_dates = {}
     for game, info in GAME_RELEASES.items():
-        if game not in df['game'].values:
+        if game not in game_frames:
             logger.warning(f"No data for {game}")
             continue
 
-        # Get release date (prefer PC release for Steam data)
         release_str = info.get('pc') or info.get('console')
         if not release_str:
             logger.warning(f"No release date for {game}")
             continue
 
-        release_date = pd.to_datetime(release_str)
+        release_dates[game] = pd.to_datetime(release_str)
 
-        # Get game data
-        game_df = df[df['game'] == game].copy()
+    # Find stabilization for every game in one pass
+    results = find_stabilization_points(df, release_dates)
 
-        # Find stabilization
-        result = find_stabilization_point(game_df, game, release_date)
-        if result:
-            results.append(result)
+    # Queue one plot per game with a result
+    plots = []
+    for result in results:
+        game = result['game']
+        plot_path = OUTPUT_FIGURES / f"player_curve_{game.lower().replace(' ', '_')}.png"
+        plots.append((
+            game_frames[game], game, release_dates[game],
+            pd.to_datetime(result['stabilization_date']),
+            plot_path
+        ))
 
-            # Generate plot
-            plot_path = OUTPUT_FIGURES / f"player_curve_{game.lower().replace(' ', '_')}.png"
-            plot_player_curve(
-                game_df, game, release_date,
-                pd.to_datetime(result['stabilization_date']),
-                plot_path
-            )
+    # Games are independent, so render their plots on a thread pool
+    if plots:
+        with ThreadPoolExecutor(max_workers=min(len(plots), os.cpu_count() or 1)) as executor:
+            list(executor.map(lambda args: plot_player_curve(*args), plots))
 
     return pd.DataFrame(results)
 
@@ -235,7 +297,7 @@ def main():
 
     # Save release windows
     output_path = DATA_PROCESSED / "release_windows.csv"
-    release_windows.to_csv(output_path, index=False)
+    write_csv(release_windows, output_path)
     logger.info(f"Saved release windows to {output_path}")
 
     # Print summary
@@ -7,16 +7,115 @@ Creates daily and hourly aggregates.
 
 import pandas as pd
 import numpy as np
+import pyarrow.parquet as pq
 from pathlib import Path
 
 # Add parent to path for imports
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.utils import DATA_RAW, DATA_PROCESSED, setup_logging, ensure_dirs
+from src.utils import (
+    DATA_RAW, DATA_PROCESSED, setup_logging, ensure_dirs, summarize_daily_violations,
+    write_csv
+)
 
 logger = setup_logging(__name__)
 
+# NYC violation times look like "10:46P" or "12:03A"; the colon, minutes,
+# seconds and AM/PM marker are all optional in the messier records
+NYC_TIME_PATTERN = r'^(\d{1,2})(?::?\d{2}){0,2}\s*([AP])?M?$'
+
+# NYC violation types, in sorted order so categorical sorts match strings
+VIOLATION_TYPES = ['other', 'redlight', 'speed', 'unknown']
+
+# Records parsed and counted at a time when streaming the NYC file
+NYC_BATCH_ROWS = 1_000_000
+
+
+def parse_violation_dates(dates: pd.Series, format: str = '%m/%d/%Y') -> pd.Series:
+    """
+    Parse violation date strings (e.g. NYC issue dates like '09/17/2013').
+
+    A few thousand distinct dates repeat across millions of records, so each
+    distinct value is parsed once and the results are gathered back by
+    factorized code.
+
+    Args:
+        dates: Raw date strings
+        format: strptime format of the dates, or None to infer it
+
+    Returns:
+        Datetime Series, NaT where the date is missing or unparseable
+    """
+    codes, uniques = pd.factorize(dates)
+    parsed = pd.to_datetime(pd.Index(uniques), format=format, errors='coerce')
+
+    # Missing dates get code -1, which take() fills with NaT
+    return pd.Series(parsed.array.take(codes, allow_fill=True), index=dates.index)
+
+
+def parse_violation_hours(times: pd.Series) -> pd.Series:
+    """
+    Parse NYC violation times like '10:46P' or '12:03A' to hours (0-23).
+
+    There are only a few thousand distinct times among millions of records,
+    so each distinct value is parsed once (regex extraction plus a few array
+    operations) and the hours are gathered back by factorized code.
+
+    Args:
+        times: Raw violation_time strings
+
+    Returns:
+        Nullable Int8 Series of hours, <NA> where the time is missing or
+        unparseable
+    """
+    codes, uniques = pd.factorize(times)
+    parts = pd.Series(uniques, dtype='string').str.strip().str.upper().str.extract(NYC_TIME_PATTERN)
+    hour = pd.to_numeric(parts[0], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    marker = parts[1].fillna('').to_numpy(dtype=object)
+
+    # Convert to 24-hour format: 12 AM is hour 0, PM adds 12 except at noon
+    is_pm = marker == 'P'
+    has_marker = is_pm | (marker == 'A')
+    hour24 = np.where(has_marker, hour % 12 + np.where(is_pm, 12, 0), hour)
+
+    # A 12-hour clock reading can't exceed 12, and nothing exceeds 23
+    valid = (hour24 <= 23) & ~(has_marker & (hour > 12))
+    hours = np.append(np.where(valid, hour24, np.nan), np.nan)
+
+    # Missing times get code -1, which picks the trailing NaN
+    return pd.Series(hours[codes], index=times.index).astype('Int8')
+
+
+def classify_violations(violations: pd.Series) -> pd.Series:
+    """
+    Classify NYC violation descriptions as redlight, speed, other or unknown.
+
+    Like parse_violation_hours(), the substring checks run once per distinct
+    description and the labels are gathered back by factorized code.
+
+    Args:
+        violations: Raw violation descriptions
+
+    Returns:
+        Categorical Series of violation types; missing descriptions are
+        'unknown'
+    """
+    codes, uniques = pd.factorize(violations)
+    upper = pd.Series(uniques, dtype='string').str.upper()
+
+    red = upper.str.contains('RED LIGHT', regex=False).to_numpy(dtype=bool)
+    speed = upper.str.contains('SPEED|SCHOOL ZONE|CAMERA').to_numpy(dtype=bool)
+
+    # Codes into VIOLATION_TYPES; red light wins over the speed keywords
+    type_codes = np.append(np.select([red, speed], [1, 2], default=0), 3)
+
+    # Missing descriptions get code -1, which picks the trailing 'unknown'
+    return pd.Series(
+        pd.Categorical.from_codes(type_codes[codes], categories=VIOLATION_TYPES),
+        index=violations.index
+    )
+
 
 def process_nyc_violations() -> tuple[pd.DataFrame, pd.DataFrame]:
     """
@@ -30,177 +129,137 @@ def process_nyc_violations() -> tuple[pd.DataFrame, pd.DataFrame]:
     Returns:
         Tuple of (daily_df, hourly_df)
     """
-    path = DATA_RAW / "nyc_camera_violations.csv"
+    path = DATA_RAW / "nyc_camera_violations.parquet"
     if not path.exists():
         logger.warning(f"NYC data not found at {path}")
         return pd.DataFrame(), pd.DataFrame()
 
     logger.info(f"Loading NYC violations from {path}...")
 
-    # Load in chunks due to size
-    chunks = []
-    for chunk in pd.read_csv(path, chunksize=500000):
-        chunks.append(chunk)
-    df = pd.concat(chunks, ignore_index=True)
-
-    logger.info(f"Loaded {len(df):,} NYC violation records")
-
-    # Parse issue_date
-    df['date'] = pd.to_datetime(df['issue_date'], format='%m/%d/%Y', errors='coerce')
-
-    # Drop rows with invalid dates
-    valid_dates = df['date'].notna()
-    logger.info(f"Dropping {(~valid_dates).sum():,} rows with invalid dates")
-    df = df[valid_dates].copy()
-
-    # Filter to reasonable date range (2010-2025)
-    reasonable_dates = (df['date'] >= '2010-01-01') & (df['date'] <= '2025-12-31')
-    logger.info(f"Dropping {(~reasonable_dates).sum():,} rows outside 2010-2025 range")
-    df = df[reasonable_dates].copy()
-
-    # Parse violation time to extract hour
-    def parse_time_to_hour(time_str):
-        """Parse NYC time format like '10:46P' or '12:03A' to hour (0-23)."""
-        if pd.isna(time_str) or not isinstance(time_str, str):
-            return np.nan
-        try:
-            time_str = time_str.strip().upper()
-            # Handle formats like "10:46P" or "10:46PM"
-            is_pm = 'P' in time_str
-            is_am = 'A' in time_str
-
-            # Remove AM/PM indicator
-            time_str = time_str.replace('PM', '').replace('AM', '').replace('P', '').replace('A', '')
-
-            # Parse hour
-            parts = time_str.split(':')
-            hour = int(parts[0])
-
-            # Convert to 24-hour format
-            if is_pm and hour != 12:
-                hour += 12
-            elif is_am and hour == 12:
-                hour = 0
-
-            return hour
-        except (ValueError, IndexError):
-            return np.nan
-
-    logger.info("Parsing violation times...")
-    df['hour'] = df['violation_time'].apply(parse_time_to_hour)
-
-    # Extract day of week (0=Monday, 6=Sunday)
-    df['day_of_week'] = df['date'].dt.dayofweek
-
-    # Classify violation type
-    def classify_violation(v):
-        if pd.isna(v):
-            return 'unknown'
-        v_upper = str(v).upper()
-        if 'RED LIGHT' in v_upper:
-            return 'redlight'
-        elif 'SPEED' in v_upper or 'SCHOOL ZONE' in v_upper or 'CAMERA' in v_upper:
-            return 'speed'
-        else:
-            return 'other'
-
-    df['violation_type'] = df['violation'].apply(classify_violation)
+    # Read the text columns dictionary-encoded: each holds a few thousand
+    # distinct values across millions of rows, so they decode straight to
+    # categoricals instead of one string object per row
+    nyc_columns = ['issue_date', 'violation_time', 'violation']
+    parquet_file = pq.ParquetFile(path, read_dictionary=nyc_columns)
+
+    logger.info(f"Loaded {parquet_file.metadata.num_rows:,} NYC violation records")
+
+    # Count every (day, hour, type) cell by packing the keys into a single
+    # int64 and bincounting it; unparseable hours get their own slot (24).
+    # The weekday follows from the day, so it isn't part of the key. Days
+    # are limited to a reasonable range (2010-2025), so the count table has
+    # a fixed size and each batch is parsed and counted straight into it;
+    # no more than one batch of records is held in memory at a time.
+    first_day, last_day = (np.datetime64(d, 'D').view('int64') for d in ('2010-01-01', '2025-12-31'))
+    n_types = len(VIOLATION_TYPES)
+    cell_counts = np.zeros((last_day - first_day + 1) * 25 * n_types, dtype=np.int64)
+    n_invalid = n_out_of_range = 0
+
+    for batch in parquet_file.iter_batches(batch_size=NYC_BATCH_ROWS, columns=nyc_columns):
+        df = batch.to_pandas()
+
+        # Parse issue_date
+        dates = parse_violation_dates(df['issue_date'])
+
+        # Drop rows with invalid dates or outside the range in one filter;
+        # NaT fails both range comparisons
+        valid_dates = dates.notna()
+        reasonable_dates = (dates >= '2010-01-01') & (dates <= '2025-12-31')
+        n_invalid += (~valid_dates).sum()
+        n_out_of_range += (valid_dates & ~reasonable_dates).sum()
+        df = df[reasonable_dates]
+
+        # Parse violation time to extract hour, and classify the violation
+        day = dates[reasonable_dates].to_numpy().astype('datetime64[D]').view('int64')
+        hour_code = parse_violation_hours(df['violation_time']).fillna(24).to_numpy(dtype=np.int64)
+        type_code = classify_violations(df['violation']).cat.codes.to_numpy(dtype=np.int64)
+
+        cell_counts += np.bincount(
+            ((day - first_day) * 25 + hour_code) * n_types + type_code,
+            minlength=len(cell_counts)
+        )
+
+    logger.info(f"Dropping {n_invalid:,} rows with invalid dates")
+    logger.info(f"Dropping {n_out_of_range:,} rows outside 2010-2025 range")
 
     # Log violation type breakdown
-    logger.info(f"Violation types: {df['violation_type'].value_counts().to_dict()}")
-
-    # Create daily aggregates
-    logger.info("Creating daily aggregates...")
-    daily = df.groupby(['date', 'day_of_week', 'violation_type']).size().reset_index(name='count')
-    daily['city'] = 'NYC'
-
-    # Create hourly aggregates (only for rows with valid hours)
-    logger.info("Creating hourly aggregates...")
-    df_with_hour = df[df['hour'].notna()].copy()
-    hourly = df_with_hour.groupby(['date', 'hour', 'day_of_week', 'violation_type']).size().reset_index(name='count')
-    hourly['city'] = 'NYC'
+    type_counts = pd.Series(cell_counts.reshape(-1, n_types).sum(axis=0), index=VIOLATION_TYPES)
+    logger.info(f"Violation types: {type_counts.sort_values(ascending=False).to_dict()}")
+
+    logger.info("Creating hourly and daily aggregates...")
+    cells = np.flatnonzero(cell_counts)
+    cell_counts = cell_counts[cells]
+    cell_day, cell_hour, cell_type = cells // (25 * n_types), cells // n_types % 25, cells % n_types
+
+    def aggregate_frame(day_offset, type_code, counts, **extra):
+        """Unpack day offsets and type codes into an aggregate frame."""
+        days = day_offset + first_day
+        return pd.DataFrame({
+            'date': days.astype('datetime64[D]').astype('datetime64[ns]'),
+            **extra,
+            # 1970-01-01 was a Thursday (weekday 3)
+            'day_of_week': ((days + 3) % 7).astype(np.int8),
+            'violation_type': pd.Categorical.from_codes(type_code, categories=VIOLATION_TYPES),
+            'count': counts,
+            'city': 'NYC',
+        })
+
+    # Hourly aggregates are the cells with a parsed hour
+    has_hour = cell_hour < 24
+    hourly = aggregate_frame(
+        cell_day[has_hour], cell_type[has_hour], cell_counts[has_hour],
+        hour=cell_hour[has_hour].astype(np.int8)
+    )
+
+    # Daily aggregates sum each day's cells over all hours, including the
+    # unparseable ones, with a second bincount over the small cell table
+    day_counts = np.bincount(cell_day * n_types + cell_type, weights=cell_counts).astype(np.int64)
+    day_cells = np.flatnonzero(day_counts)
+    daily = aggregate_frame(day_cells // n_types, day_cells % n_types, day_counts[day_cells])
 
     logger.info(f"NYC: {len(daily):,} daily records, {len(hourly):,} hourly records")
 
     return daily, hourly
 
 
-def process_chicago_speed() -> pd.DataFrame:
+def process_chicago_violations(violation_type: str) -> pd.DataFrame:
     """
-    Process Chicago speed camera violations.
+    Process Chicago speed or red light camera violations.
 
-    Chicago data is already aggregated by camera per day:
+    Both datasets are already aggregated by camera per day:
     - violation_date: date of violations
     - violations: count of violations
     - camera_id: camera identifier
-    """
-    path = DATA_RAW / "chicago_speed_violations.csv"
-    if not path.exists():
-        logger.warning(f"Chicago speed data not found at {path}")
-        return pd.DataFrame()
-
-    logger.info(f"Loading Chicago speed violations from {path}...")
-    df = pd.read_csv(path)
-    logger.info(f"Loaded {len(df):,} Chicago speed records")
-
-    # Parse date
-    df['date'] = pd.to_datetime(df['violation_date'], errors='coerce')
-
-    # Drop rows with invalid dates
-    valid_dates = df['date'].notna()
-    df = df[valid_dates].copy()
 
-    # Extract day of week
-    df['day_of_week'] = df['date'].dt.dayofweek
+    Args:
+        violation_type: 'speed' or 'redlight'
 
-    # Aggregate by date (sum all cameras for that day)
-    daily = df.groupby(['date', 'day_of_week']).agg({
-        'violations': 'sum'
-    }).reset_index()
-
-    daily = daily.rename(columns={'violations': 'count'})
-    daily['city'] = 'Chicago'
-    daily['violation_type'] = 'speed'
-
-    logger.info(f"Chicago speed: {len(daily):,} daily records")
-    return daily
-
-
-def process_chicago_redlight() -> pd.DataFrame:
-    """
-    Process Chicago red light camera violations.
-
-    Same structure as speed data.
+    Returns:
+        DataFrame of daily totals across all cameras
     """
-    path = DATA_RAW / "chicago_redlight_violations.csv"
+    path = DATA_RAW / f"chicago_{violation_type}_violations.parquet"
     if not path.exists():
-        logger.warning(f"Chicago red light data not found at {path}")
+        logger.warning(f"Chicago {violation_type} data not found at {path}")
         return pd.DataFrame()
 
-    logger.info(f"Loading Chicago red light violations from {path}...")
-    df = pd.read_csv(path)
-    logger.info(f"Loaded {len(df):,} Chicago red light records")
-
-    # Parse date
-    df['date'] = pd.to_datetime(df['violation_date'], errors='coerce')
+    logger.info(f"Loading Chicago {violation_type} violations from {path}...")
+    df = pd.read_parquet(
+        path, columns=['violation_date', 'violations'], read_dictionary=['violation_date']
+    )
+    logger.info(f"Loaded {len(df):,} Chicago {violation_type} records")
 
-    # Drop rows with invalid dates
-    valid_dates = df['date'].notna()
-    df = df[valid_dates].copy()
+    # Socrata returns every field as text
+    counts = pd.to_numeric(df['violations'], errors='coerce')
+    dates = parse_violation_dates(df['violation_date'], format=None)
 
-    # Extract day of week
-    df['day_of_week'] = df['date'].dt.dayofweek
-
-    # Aggregate by date (sum all cameras for that day)
-    daily = df.groupby(['date', 'day_of_week']).agg({
-        'violations': 'sum'
-    }).reset_index()
-
-    daily = daily.rename(columns={'violations': 'count'})
+    # Aggregate by date (sum all cameras for that day); rows with invalid
+    # dates are dropped by the groupby, and the weekday follows from the date
+    daily = counts.groupby(dates.rename('date'), sort=False).sum().reset_index(name='count')
+    daily['day_of_week'] = daily['date'].dt.dayofweek
     daily['city'] = 'Chicago'
-    daily['violation_type'] = 'redlight'
+    daily['violation_type'] = violation_type
 
-    logger.info(f"Chicago red light: {len(daily):,} daily records")
+    logger.info(f"Chicago {violation_type}: {len(daily):,} daily records")
     return daily
 
 
@@ -212,8 +271,8 @@ def main():
     nyc_daily, nyc_hourly = process_nyc_violations()
 
     # Process Chicago
-    chicago_speed = process_chicago_speed()
-    chicago_redlight = process_chicago_redlight()
+    chicago_speed = process_chicago_violations('speed')
+    chicago_redlight = process_chicago_violations('redlight')
 
     # Combine daily data
     daily_dfs = [df for df in [nyc_daily, chicago_speed, chicago_redlight] if not df.empty]
@@ -223,22 +282,31 @@ def main():
 
     daily = pd.concat(daily_dfs, ignore_index=True)
 
-    # Ensure consistent column order
+    # Ensure consistent column order, with the smallest integer types that
+    # fit (hour and weekday fit in int8, daily counts in int32)
     daily = daily[['city', 'date', 'day_of_week', 'violation_type', 'count']]
+    daily = daily.astype({'day_of_week': 'int8', 'count': 'int32'})
     daily = daily.sort_values(['city', 'date', 'violation_type']).reset_index(drop=True)
 
     # Save daily data
     daily_path = DATA_PROCESSED / "daily_violations.csv"
-    daily.to_csv(daily_path, index=False)
+    write_csv(daily, daily_path, cache=True)
     logger.info(f"Saved {len(daily):,} daily violation records to {daily_path}")
 
+    # Save the per-city, per-type summary the final report uses, so it
+    # doesn't have to regroup the daily data
+    summary_path = DATA_PROCESSED / "daily_violations_summary.csv"
+    write_csv(summarize_daily_violations(daily), summary_path)
+    logger.info(f"Saved violation summary to {summary_path}")
+
     # Save hourly data if available
     if not nyc_hourly.empty:
         hourly = nyc_hourly[['city', 'date', 'hour', 'day_of_week', 'violation_type', 'count']]
+        hourly = hourly.astype({'hour': 'int8', 'day_of_week': 'int8', 'count': 'int32'})
         hourly = hourly.sort_values(['city', 'date', 'hour', 'violation_type']).reset_index(drop=True)
 
         hourly_path = DATA_PROCESSED / "hourly_violations.csv"
-        hourly.to_csv(hourly_path, index=False)
+        write_csv(hourly, hourly_path, cache=True)
         logger.info(f"Saved {len(hourly):,} hourly violation records to {hourly_path}")
     else:
         logger.warning("No hourly data available")
@@ -0,0 +1,301 @@
+"""
+Socrata API collection helpers shared by the NYC and Chicago collectors.
+
+Kept apart from src.utils so the offline processing and analysis steps
+don't need the collection dependencies (sodapy).
+"""
+
+import csv
+import io
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+from urllib.parse import urlencode
+
+import pyarrow as pa
+import requests
+from pyarrow import csv as pa_csv
+from pyarrow import parquet as pq
+from sodapy import Socrata
+
+from src.utils import SOCRATA_APP_TOKEN, setup_logging
+
+logger = setup_logging(__name__)
+
+
+def write_parquet_pages(pages, output_path: Path) -> int:
+    """
+    Stream pages of records into a single Parquet file.
+
+    Each page is appended as it arrives, so memory stays at about one page
+    however large the dataset. Pages may be Arrow tables (e.g. parsed CSV
+    responses) or lists of JSON records. The schema is taken from the first
+    non-empty page and reused; for JSON records, columns that are entirely
+    null there are stored as strings. Fields that first appear on later
+    pages are dropped with a warning, so callers should request a fixed
+    column list (e.g. a Socrata $select).
+
+    Args:
+        pages: Iterable of Arrow tables or record lists (e.g. Socrata API responses)
+        output_path: Parquet file to (over)write
+
+    Returns:
+        Number of records written (no file is written if zero)
+    """
+    writer = None
+    schema = None
+    n_rows = 0
+
+    try:
+        for page in pages:
+            if isinstance(page, pa.Table):
+                if page.num_rows == 0:
+                    continue
+                if schema is None:
+                    schema = page.schema
+                extra = [name for name in page.column_names if name not in schema.names]
+                if extra:
+                    logger.warning(f"Dropping columns not on the first page: {extra}")
+                    page = page.select(schema.names)
+                table = page.cast(schema)
+            else:
+                if not page:
+                    continue
+                if schema is None:
+                    # Socrata omits null fields from a record, so take the
+                    # column list from the whole page rather than its first record
+                    columns = dict.fromkeys(key for record in page for key in record)
+                    inferred = pa.RecordBatch.from_pydict(
+                        {col: [record.get(col) for record in page] for col in columns}
+                    ).schema
+                    schema = pa.schema([
+                        field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                        for field in inferred
+                    ])
+                extra = {key for record in page for key in record}.difference(schema.names)
+                if extra:
+                    logger.warning(f"Dropping fields not on the first page: {sorted(extra)}")
+                table = pa.Table.from_pylist(page, schema=schema)
+
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, schema, compression='zstd')
+
+            writer.write_table(table)
+            n_rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return n_rows
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Whether a failed request is worth retrying.
+
+    Connection failures, timeouts, rate limiting (HTTP 429) and server
+    errors (5xx) may succeed on a later attempt; other HTTP errors (e.g. a
+    400 for malformed SoQL) and programming errors won't.
+
+    Args:
+        error: Exception raised by the request
+
+    Returns:
+        True if the request should be retried
+    """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return False
+
+
+def fetch_cached_page(cache_path: Path, query: str, offset: int, fetch,
+                      retries: int = 5) -> bytes:
+    """
+    Fetch one page of a paginated API through a resumable on-disk cache.
+
+    Page bodies are stored in SQLite keyed by (query, offset) as soon as they
+    arrive, so a collection that fails part-way resumes from the pages it
+    already has instead of starting over. Transient failures (see
+    is_transient_error) are retried with exponential backoff (1s, 2s, 4s,
+    ... capped at 30s); any other error is raised immediately. Safe to call
+    from several threads; each call uses its own connection.
+
+    Args:
+        cache_path: SQLite file holding the cached pages
+        query: Key identifying the request apart from its offset (filter,
+            projection, page size); pages cached under another query are ignored
+        offset: Row offset of the page
+        fetch: Function offset -> bytes that requests the page
+        retries: Attempts before the last error is raised
+
+    Returns:
+        The page body
+    """
+    with closing(sqlite3.connect(cache_path, timeout=60)) as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages (query TEXT, page_offset INTEGER, body BLOB, "
+            "PRIMARY KEY (query, page_offset))"
+        )
+        row = conn.execute(
+            "SELECT body FROM pages WHERE query = ? AND page_offset = ?", (query, offset)
+        ).fetchone()
+    if row is not None:
+        return row[0]
+
+    for attempt in range(retries):
+        try:
+            body = fetch(offset)
+            break
+        except Exception as e:
+            if attempt == retries - 1 or not is_transient_error(e):
+                raise
+            time.sleep(min(2 ** attempt, 30))
+
+    with closing(sqlite3.connect(cache_path, timeout=60)) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?)", (query, offset, body)
+        )
+
+    return body
+
+
+def read_csv_page(body: bytes) -> pa.Table:
+    """
+    Parse one CSV page of a Socrata API response with Arrow.
+
+    Every column is read as text (no type inference), as in the JSON API,
+    with empty cells as nulls like the fields the JSON API omits.
+
+    Args:
+        body: CSV response body, header row included
+
+    Returns:
+        Arrow table of string columns
+    """
+    first_line = body.split(b'\n', 1)[0].decode('utf-8-sig').rstrip('\r')
+    header = next(csv.reader([first_line]))
+    convert_options = pa_csv.ConvertOptions(
+        column_types={name: pa.string() for name in header}, strings_can_be_null=True
+    )
+    return pa_csv.read_csv(io.BytesIO(body), convert_options=convert_options)
+
+
+def fetch_socrata_data(domain: str, dataset_id: str, output_path: Path,
+                       limit_per_page: int = 50000, date_column: str = None,
+                       date_ranges: list = None, where: str = None, select: str = None,
+                       max_workers: int = 8, timeout: int = 60) -> int:
+    """
+    Fetch all data from a Socrata dataset into a Parquet file.
+
+    The matching row count is requested first, then pages are fetched as CSV
+    on a thread pool and streamed to Parquet in offset order, so memory stays
+    flat at a few pages rather than growing with the dataset.
+
+    Args:
+        domain: Socrata domain (e.g., "data.cityofnewyork.us")
+        dataset_id: Dataset identifier
+        output_path: Parquet file to write the records to
+        limit_per_page: Number of records per API request
+        date_column: Floating-timestamp column to filter on server-side
+        date_ranges: (start, end) Timestamps to keep, e.g. from release_date_ranges()
+        where: Additional SoQL filter, combined with the date ranges
+        select: SoQL column projection (all columns if None)
+        max_workers: Maximum number of concurrent page requests
+        timeout: Seconds to wait for each request
+
+    Returns:
+        Number of records written
+    """
+    logger.info(f"Fetching data from {domain}/{dataset_id}")
+
+    # Filter on the server so only rows in the analysis windows are sent
+    filters = [where] if where else []
+    if date_column and date_ranges:
+        filters.append(" OR ".join(
+            f"{date_column} between '{start:%Y-%m-%dT00:00:00}' and '{end:%Y-%m-%dT23:59:59}'"
+            for start, end in date_ranges
+        ))
+    where = " AND ".join(f"({condition})" for condition in filters) or None
+    if where:
+        logger.info(f"  Filter: {where}")
+
+    # Create client (no auth needed for public data; an app token raises
+    # the rate limit for concurrent requests)
+    client = Socrata(domain, SOCRATA_APP_TOKEN)
+    client.timeout = timeout
+
+    # Count matching rows so every page can be requested up front
+    try:
+        total = int(client.get(dataset_id, select="count(*) AS n", where=where)[0]['n'])
+    except Exception as e:
+        logger.error(f"  Error counting records: {e}")
+        client.close()
+        return 0
+
+    # Safety limit - some datasets have tens of millions of rows
+    if total > 5_000_000:
+        logger.warning(f"  {total:,} records match, fetching only the first 5M")
+        total = 5_000_000
+
+    offsets = range(0, total, limit_per_page)
+    logger.info(f"  Fetching {total:,} records in {len(offsets)} pages...")
+
+    # Pages are requested as CSV and parsed by Arrow (read_csv_page),
+    # skipping JSON decoding and per-row dicts
+    url = f"https://{domain}/resource/{dataset_id}.csv"
+    params = {'$where': where, '$select': select, '$order': ':id', '$limit': limit_per_page}
+    params = {key: value for key, value in params.items() if value is not None}
+
+    # Pages are kept on disk as they arrive, so a failed run resumes from
+    # the pages it already has; the cache is removed once every page is in
+    cache_path = output_path.with_suffix('.pages.sqlite')
+    query = urlencode(params)
+    failed_offsets = []
+
+    def download_page(offset):
+        # Order by row id so pages don't overlap or shift between requests
+        response = client.session.get(url, params={**params, '$offset': offset},
+                                      timeout=client.timeout)
+        response.raise_for_status()
+        return response.content
+
+    def fetch_page(offset):
+        return read_csv_page(fetch_cached_page(cache_path, query, offset, download_page))
+
+    def fetch_pages():
+        # Keep a bounded window of requests in flight and hand pages on in
+        # offset order, so only a few pages are held in memory at once
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = deque()
+            for offset in offsets:
+                in_flight.append((offset, executor.submit(fetch_page, offset)))
+                if len(in_flight) >= 2 * max_workers:
+                    yield next_page(in_flight)
+            while in_flight:
+                yield next_page(in_flight)
+
+    def next_page(in_flight):
+        offset, future = in_flight.popleft()
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"  Error fetching records {offset} to {offset + limit_per_page}: {e}")
+            failed_offsets.append(offset)
+            return []
+
+    n_rows = write_parquet_pages(fetch_pages(), output_path)
+    client.close()
+
+    if failed_offsets:
+        logger.warning(f"  {len(failed_offsets)} pages failed; re-run to resume from {cache_path}")
+    else:
+        cache_path.unlink(missing_ok=True)
+
+    logger.info(f"  Saved {n_rows:,} total records to {output_path}")
+    return n_rows
@@ -2,9 +2,16 @@
 Shared utilities for GTA Risky Driving Stats project.
 """
 
+import csv
+import io
 import logging
+import os
 from pathlib import Path
 
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
 # Project root directory
 PROJECT_ROOT = Path(__file__).parent.parent
 
@@ -17,6 +24,29 @@ DATA_ANALYSIS = PROJECT_ROOT / "data" / "analysis"
 OUTPUT_FIGURES = PROJECT_ROOT / "output" / "figures"
 OUTPUT_TABLES = PROJECT_ROOT / "output" / "tables"
 
+# Compact dtypes for the processed CSVs (low-cardinality strings as
+# categories, small integers downcast)
+DAILY_DTYPES = {
+    'city': 'category',
+    'day_of_week': 'int8',
+    'violation_type': 'category',
+    'count': 'int32',
+}
+HOURLY_DTYPES = {
+    **DAILY_DTYPES,
+    'hour': 'int8',
+}
+TAGGED_DTYPES = {
+    **DAILY_DTYPES,
+    'period': 'category',
+    'treatment': 'category',
+    'release_id': 'category',
+}
+PLAYER_DTYPES = {
+    'game': 'category',
+    'avg_players': 'float32',
+}
+
 
 def setup_logging(name: str, level: int = logging.INFO) -> logging.Logger:
     """Set up a logger with console output."""
@@ -35,6 +65,7 @@ def setup_logging(name: str, level: int = logging.INFO) -> logging.Logger:
     return logger
 
 
+
 def ensure_dirs():
     """Ensure all data and output directories exist."""
     for dir_path in [DATA_RAW, DATA_PROCESSED, DATA_ANALYSIS, OUTPUT_FIGURES, OUTPUT_TABLES]:
@@ -73,3 +104,158 @@ NYC_SPEED_ENDPOINT = "https://data.cityofnewyork.us/resource/hazs-r364.json"  #
 # Chicago Data Portal endpoints
 CHICAGO_SPEED_ENDPOINT = "https://data.cityofchicago.org/resource/hhkd-xvj4.json"
 CHICAGO_REDLIGHT_ENDPOINT = "https://data.cityofchicago.org/resource/spqx-js37.json"
+
+# Optional Socrata app token; unauthenticated requests are throttled harder
+SOCRATA_APP_TOKEN = os.environ.get("SOCRATA_APP_TOKEN")
+
+
+def release_date_ranges(days_before: int = 42, days_after: int = 90,
+                        reference_years: int = 1) -> list:
+    """
+    Date ranges covering every game's analysis windows.
+
+    Each release contributes [release - days_before, release + days_after],
+    widened by reference_years on both sides for the reference-year
+    windows. The defaults cover the pre-period (42 days before release),
+    the latest post-period (60-day maximum lag + 28 days) and the event
+    study (90 days after). Overlapping ranges are merged.
+
+    Returns:
+        Sorted list of (start, end) Timestamps
+    """
+    ranges = []
+    for info in GAME_RELEASES.values():
+        release_str = info.get('pc') or info.get('console')
+        if not release_str:
+            continue
+
+        release_date = pd.to_datetime(release_str)
+        start = release_date - pd.Timedelta(days=days_before) - pd.DateOffset(years=reference_years)
+        end = release_date + pd.Timedelta(days=days_after) + pd.DateOffset(years=reference_years)
+        ranges.append((start, end))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def read_csv_cached(path: Path, columns: list = None, parse_dates: list = None,
+                    dtype: dict = None) -> pd.DataFrame:
+    """
+    Read a CSV, using a sibling Parquet file as a parse cache.
+
+    The Parquet copy is used when it is at least as new as the CSV, so
+    re-running an analysis skips CSV parsing and date coercion. Otherwise
+    the CSV is parsed with Arrow's multi-threaded reader and the cache is
+    (re)written. The cache always holds every column, so loaders that need
+    different columns can share it.
+
+    Args:
+        path: Path to the source CSV
+        columns: Columns to return (all if None); only these are read from the cache
+        parse_dates: Columns to parse as datetimes
+        dtype: Column dtypes, applied after parsing and to frames read from the cache
+
+    Returns:
+        DataFrame with the CSV contents
+    """
+    cache_path = path.with_suffix('.parquet')
+    cache_fresh = cache_path.exists() and cache_path.stat().st_mtime >= path.stat().st_mtime
+
+    if cache_fresh:
+        df = pd.read_parquet(cache_path, engine='pyarrow', columns=columns)
+    else:
+        convert_options = pa_csv.ConvertOptions(
+            column_types={col: pa.timestamp('ns') for col in parse_dates or []}
+        )
+        df = pa_csv.read_csv(path, convert_options=convert_options).to_pandas()
+
+    # Arrow infers numeric columns (e.g. counts written as 891.0), so
+    # downcasts are applied here rather than at parse time
+    if dtype:
+        df = df.astype({col: t for col, t in dtype.items() if col in df.columns})
+
+    if not cache_fresh:
+        df.to_parquet(cache_path, engine='pyarrow', compression='zstd', index=False)
+        if columns is not None:
+            df = df[columns]
+
+    return df
+
+
+def write_csv(df: pd.DataFrame, path: Path, cache: bool = False):
+    """
+    Write a DataFrame to CSV with Arrow's multi-threaded writer.
+
+    A faster stand-in for df.to_csv(path, index=False). Categoricals are
+    written as their labels, datetime columns holding only midnights as
+    plain dates, and fields are only quoted when a value requires it. Floats
+    use Arrow's shortest form, so whole numbers are written without ".0".
+
+    Args:
+        df: DataFrame to write (the index is not written)
+        path: Output CSV path
+        cache: Also write the sibling Parquet cache used by read_csv_cached(),
+            so the first reader doesn't have to parse the CSV
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    columns = []
+    for field, column in zip(table.schema, table.columns):
+        if pa.types.is_dictionary(field.type):
+            column = column.cast(field.type.value_type)
+        elif pa.types.is_timestamp(field.type):
+            try:
+                column = column.cast(pa.date32())
+            except pa.ArrowInvalid:
+                pass  # Has a time of day; keep the full timestamp
+        columns.append(column)
+    table = pa.table(columns, names=table.column_names)
+
+    header = io.StringIO()
+    csv.writer(header, lineterminator='\n').writerow(table.column_names)
+    header = header.getvalue().encode()
+
+    with open(path, 'wb') as f:
+        f.write(header)
+        try:
+            pa_csv.write_csv(table, f, write_options=pa_csv.WriteOptions(
+                include_header=False, quoting_style='none'
+            ))
+        except pa.ArrowInvalid:
+            # Some value contains a comma, quote or newline: rewrite quoted
+            f.seek(len(header))
+            f.truncate()
+            pa_csv.write_csv(table, f, write_options=pa_csv.WriteOptions(include_header=False))
+
+    # Written after the CSV so the cache counts as fresh
+    if cache:
+        df.to_parquet(path.with_suffix('.parquet'), engine='pyarrow', compression='zstd', index=False)
+
+
+def summarize_daily_violations(daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summarize daily violation counts by city and violation type.
+
+    process_violations stores this next to the daily data when it writes it,
+    and the final report reads it back instead of regrouping every day.
+
+    Args:
+        daily: Daily violations with city, violation_type and count columns
+
+    Returns:
+        DataFrame with city, violation_type and the total, mean, std, min
+        and max of the daily counts
+    """
+    summary = daily.groupby(['city', 'violation_type'], observed=True).agg({
+        'count': ['sum', 'mean', 'std', 'min', 'max']
+    }).reset_index()
+
+    summary.columns = ['city', 'violation_type', 'total', 'daily_mean', 'daily_std', 'daily_min', 'daily_max']
+
+    return summary